@@ -0,0 +1,311 @@
+# export_predictor.py
+import argparse
+import importlib.util
+import os
+import pprint
+import random
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas as pd
+from model.FeatureEncoder import FeatureEncoder
+from model.Model import Model
+from model.features import FEATURE_ORDER, LABEL_TO_FEATURE, VALUE_MAPPING
+
+"""
+- Exports the trained decision tree as model/compiled_predictor.py: the tree_ arrays, the feature
+  order and the form encodings of model/features.py, with encode() and predict() in plain NumPy.
+- The GUI, the server and predict_batch.py use it through model/CompiledModel.py when sklearn or
+  pandas are missing (e.g. a PyInstaller build with --exclude-module sklearn --exclude-module pandas)
+  or when asked to (HDA_COMPILED_MODEL=1, --compiled).
+- The new module is checked against sklearn before it replaces the old one: predictions on the
+  whole dataset (as a matrix and row by row) and on random rows, form encodings against
+  FeatureEncoder, and an import that must not load sklearn, scipy or pandas.
+- Run from app/ after retraining or changing the tree params: python export_predictor.py
+  (python export_predictor.py --check only checks the current module).
+"""
+
+# Generated module, imported as model.compiled_predictor
+OUTPUT_PATH = os.path.join("model", "compiled_predictor.py")
+
+# Random rows scored by the parity check, on top of heart.csv
+RANDOM_ROWS = 100000
+
+MODULE_TEMPLATE = '''\
+# Generated by export_predictor.py, do not edit: re-run it after retraining or changing the params.
+import numpy as np
+
+"""
+- Decision tree exported from the trained Model, scored with NumPy only (no sklearn or pandas).
+- Artifact {key}, params {params}: {node_count} nodes, depth {max_depth}.
+- encode() takes the same form values as FeatureEncoder, predict() gives the same results as
+  DecisionTreeClassifier.predict (inputs are cast to float32 like sklearn does).
+"""
+
+ARTIFACT_KEY = {artifact_key!r}
+
+PARAMS = {params!r}
+
+FEATURE_ORDER = {feature_order}
+
+LABEL_TO_FEATURE = {label_to_feature}
+
+VALUE_MAPPING = {value_mapping}
+
+CLASSES = np.array({classes!r})
+
+MAX_DEPTH = {max_depth}
+
+FEATURE = np.array({feature}, dtype=np.intp)
+
+THRESHOLD = np.array({threshold}, dtype=np.float64)
+
+CHILDREN_LEFT = np.array({children_left}, dtype=np.intp)
+
+CHILDREN_RIGHT = np.array({children_right}, dtype=np.intp)
+
+# Index into CLASSES of the class predicted at every node
+NODE_CLASS = np.array({node_class}, dtype=np.intp)
+
+# Marker sklearn uses for a missing child
+TREE_LEAF = -1
+
+
+class EncodingError(ValueError):
+
+    # Constructor, row is 1-based within the encoded batch
+    def __init__(self, label, row, message):
+        super().__init__(f"{{message}} (row {{row}})" if row is not None else message)
+        self.message = message
+        self.label = label
+        self.row = row
+
+
+# Per feature (label, feature, mapping); digit labels also match numbers, as in FeatureEncoder
+_FEATURE_TO_LABEL = {{feature: label for label, feature in LABEL_TO_FEATURE.items()}}
+_COLUMNS = []
+for _feature in FEATURE_ORDER:
+    _label = _FEATURE_TO_LABEL[_feature]
+    _mapping = VALUE_MAPPING.get(_label)
+    if _mapping is not None:
+        _mapping = dict(_mapping)
+        for _key, _value in list(_mapping.items()):
+            if _key.isdigit():
+                _mapping.setdefault(int(_key), _value)
+    _COLUMNS.append((_label, _feature, _mapping))
+
+# Plain lists are faster than array indexing for a single row walk
+_FEATURE = FEATURE.tolist()
+_THRESHOLD = THRESHOLD.tolist()
+_LEFT = CHILDREN_LEFT.tolist()
+_RIGHT = CHILDREN_RIGHT.tolist()
+
+
+# Values of one column; a record without it is an error
+def _column(records, name):
+    try:
+        return [record[name] for record in records]
+    except KeyError:
+        row = next(i for i, record in enumerate(records, 1) if name not in record)
+        raise EncodingError(name, row, f"Missing value for {{name}}")
+
+
+# Encode one dict of form values (labels, or dataset feature names) or a list of them into an (n, 13) matrix
+# Column sources are chosen from the first record, as in FeatureEncoder
+def encode(data):
+    records = [data] if isinstance(data, dict) else list(data)
+    out = np.empty((len(records), len(_COLUMNS)), dtype=np.float64)
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise EncodingError(None, i + 1, "Each patient must be a dict of form values")
+    if not records:
+        return out
+
+    first = records[0]
+    for j, (label, feature, mapping) in enumerate(_COLUMNS):
+        if label in first and mapping is not None:
+            values = _column(records, label)
+            codes = [mapping.get(value) for value in values]
+            if None in codes:
+                # Tolerate whitespace and non-string values
+                for i, code in enumerate(codes):
+                    if code is None:
+                        code = mapping.get(str(values[i]).strip())
+                        if code is None:
+                            raise EncodingError(label, i + 1, f"Invalid value for {{label}}: {{values[i]!r}}")
+                        codes[i] = code
+            out[:, j] = codes
+            continue
+
+        name = label if label in first else feature
+        if name not in first:
+            raise EncodingError(label, None, f"Missing value for {{label}}")
+        values = _column(records, name)
+        try:
+            out[:, j] = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            out[:, j] = np.nan
+        if np.isnan(out[:, j]).any():
+            for i, value in enumerate(values):
+                try:
+                    if np.isnan(float(value)):
+                        raise ValueError
+                except (TypeError, ValueError):
+                    raise EncodingError(name, i + 1, f"Invalid input for {{name}}: must be a number, got {{value!r}}")
+    return out
+
+
+# Validate input and convert it to a float32 matrix
+def _as_matrix(X):
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    if X.ndim != 2 or X.shape[1] != len(FEATURE_ORDER):
+        raise ValueError(f"Expected {{len(FEATURE_ORDER)}} features, got input with shape {{X.shape}}")
+    if not np.isfinite(X).all():
+        raise ValueError("Input contains NaN or infinity.")
+    return X
+
+
+# Index of the leaf reached by every row
+def apply(X):
+    X = _as_matrix(X)
+    if len(X) == 1:
+        values = X[0].tolist()
+        node = 0
+        while _LEFT[node] != TREE_LEAF:
+            node = _LEFT[node] if values[_FEATURE[node]] <= _THRESHOLD[node] else _RIGHT[node]
+        return np.array([node], dtype=np.intp)
+
+    rows = np.arange(len(X))
+    node = np.zeros(len(X), dtype=np.intp)
+    for _ in range(MAX_DEPTH):
+        left = CHILDREN_LEFT[node]
+        internal = left != TREE_LEAF
+        if not internal.any():
+            break
+        go_left = X[rows, FEATURE[node]] <= THRESHOLD[node]
+        node = np.where(internal, np.where(go_left, left, CHILDREN_RIGHT[node]), node)
+    return node
+
+
+# Predict one row or a matrix of rows
+def predict(X):
+    return CLASSES[NODE_CLASS[apply(X)]]
+'''
+
+
+# Python literal of a list, wrapped to the width of the generated file
+def format_list(values):
+    return pprint.pformat(list(values), width=100, compact=True)
+
+
+# Source of the predictor module for the model's tree
+def generate_source(model):
+    classifier = model.get_classifier()
+    if not hasattr(classifier, "tree_"):
+        raise ValueError(f"Only the decision tree can be exported, the model uses the '{model.backend}' backend.")
+    if list(model.get_feature_names()) != list(FEATURE_ORDER):
+        raise ValueError("The model was trained on columns that differ from FEATURE_ORDER.")
+    tree = classifier.tree_
+    return MODULE_TEMPLATE.format(
+        key=model.artifact_key[:16],
+        artifact_key=model.artifact_key,
+        params=model.params,
+        node_count=tree.node_count,
+        max_depth=tree.max_depth,
+        feature_order=format_list(FEATURE_ORDER),
+        label_to_feature=pprint.pformat(LABEL_TO_FEATURE, width=100, sort_dicts=False),
+        value_mapping=pprint.pformat(VALUE_MAPPING, width=100, sort_dicts=False),
+        classes=np.asarray(classifier.classes_).tolist(),
+        feature=format_list(tree.feature.tolist()),
+        # repr round-trips every float64 exactly
+        threshold=format_list(tree.threshold.tolist()),
+        children_left=format_list(tree.children_left.tolist()),
+        children_right=format_list(tree.children_right.tolist()),
+        node_class=format_list(np.argmax(tree.value[:, 0, :], axis=1).tolist()),
+    )
+
+
+# Import a module from a file path without touching sys.modules
+def load_module(path):
+    spec = importlib.util.spec_from_file_location("compiled_predictor_check", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Form values of a random patient, with labels like the form's comboboxes
+def random_form(rng):
+    form = {}
+    for label, feature in LABEL_TO_FEATURE.items():
+        mapping = VALUE_MAPPING.get(label)
+        form[label] = rng.choice(list(mapping)) if mapping else f"{rng.uniform(0, 300):.1f}"
+    return form
+
+
+# Raise AssertionError unless the module predicts and encodes exactly like the Model
+def check_parity(module, model, random_rows=RANDOM_ROWS):
+    classifier = model.get_classifier()
+    assert module.ARTIFACT_KEY == model.artifact_key, "predictor was exported from another model artifact"
+
+    # Whole dataset, every row of heart.csv (duplicates included)
+    model.get_training_data()
+    X = model.dataset.iloc[:, :-1].to_numpy(dtype=np.float64)
+    expected = classifier.predict(model.dataset.iloc[:, :-1])
+    assert np.array_equal(module.predict(X), expected), "predictions differ on heart.csv"
+    assert all(module.predict(row)[0] == label for row, label in zip(X, expected)), "single row predictions differ"
+
+    # Random rows over (and past) the range of every feature reach every leaf
+    rng = np.random.default_rng(0)
+    low, high = X.min(axis=0), X.max(axis=0)
+    span = high - low
+    X_random = rng.uniform(low - span / 2, high + span / 2, size=(random_rows, X.shape[1]))
+    # Values right at the thresholds, where float32 rounding matters
+    X_random[:X.shape[0]] = X
+    expected = classifier.predict(pd.DataFrame(X_random, columns=model.get_feature_names()))
+    assert np.array_equal(module.predict(X_random), expected), "predictions differ on random rows"
+
+    # Form encodings
+    encoder = FeatureEncoder()
+    python_rng = random.Random(0)
+    forms = [random_form(python_rng) for _ in range(1000)]
+    assert np.array_equal(module.encode(forms), encoder.encode(forms)), "form encodings differ"
+    assert np.array_equal(module.encode(forms[0]), encoder.encode(forms[0])), "single form encoding differs"
+
+    # Importing the module must not pull in sklearn, scipy or pandas
+    heavy = subprocess.run(
+        [sys.executable, "-c", "import runpy, sys; runpy.run_path(sys.argv[1]); "
+         "print(','.join(m for m in ('sklearn', 'scipy', 'pandas') if m in sys.modules))", module.__file__],
+        capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    assert not heavy, f"predictor imports {heavy}"
+    return len(X), random_rows, len(forms)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the decision tree as a dependency-free predictor module.")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="generated module path")
+    parser.add_argument("--check", action="store_true", help="only check the existing module against the model")
+    args = parser.parse_args()
+
+    model = Model()
+    start = time.perf_counter()
+    if args.check:
+        rows, random_rows, forms = check_parity(load_module(args.output), model)
+    else:
+        source = generate_source(model)
+        # The old module stays in place unless the new one passes the check
+        tmp_path = f"{os.path.splitext(args.output)[0]}.{os.getpid()}.tmp.py"
+        with open(tmp_path, "w", encoding='utf-8') as f:
+            f.write(source)
+        try:
+            rows, random_rows, forms = check_parity(load_module(tmp_path), model)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, args.output)
+        print(f"Predictor exported to {args.output} ({len(source) // 1024} KB)")
+    print(f"Parity with sklearn: OK ({rows} dataset rows, {random_rows} random rows, {forms} form encodings) "
+          f"in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,148 @@
+# export_reports.py
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from reports.KeyRing import KeyRing
+from reports.ReportStore import ReportStore
+
+try:
+    import resource
+except ImportError:
+    # Windows, no peak memory in the summary
+    resource = None
+
+"""
+- Exports PDF reports for every patient in the encrypted report store, without the GUI.
+- Worker processes read, decrypt and render batches of records themselves; only record offsets
+  are sent to them and only a few batches are in flight, so memory does not grow with the store.
+- Writes one PDF per patient, or with --combined paginated volumes of --per-file patients each.
+"""
+
+# Worker process state
+_cipher = None
+_data_path = None
+
+
+# Open the key and data file once per worker
+def _init_worker(key, data_path):
+    global _cipher, _data_path
+    _cipher = KeyRing.cipher_for(key)
+    _data_path = data_path
+
+
+# Read and decrypt the reports at the given locations
+def _read_reports(locations):
+    with open(_data_path, "rb") as f:
+        for offset, length in locations:
+            f.seek(offset)
+            yield json.loads(_cipher.decrypt(f.read(length)))["data"]
+
+
+# Render one PDF per patient, returns (written, failed, bytes)
+def _export_single(locations, out_dir):
+    from reports.report_pdf import ReportPDF, render_report, report_filename
+    written = failed = size = 0
+    for data in _read_reports(locations):
+        try:
+            pdf = ReportPDF()
+            render_report(pdf, data)
+            path = os.path.join(out_dir, report_filename(data))
+            pdf.output(path)
+            size += os.path.getsize(path)
+            written += 1
+        except Exception as e:
+            print(f"Could not export a report: {e}")
+            failed += 1
+    return written, failed, size
+
+
+# Render one paginated volume, returns (written, failed, bytes)
+def _export_volume(locations, out_dir, volume):
+    from reports.report_pdf import ReportPDF, render_report
+    pdf = ReportPDF(numbered=True)
+    written = failed = 0
+    for data in _read_reports(locations):
+        try:
+            render_report(pdf, data)
+            written += 1
+        except Exception as e:
+            print(f"Could not export a report: {e}")
+            failed += 1
+    path = os.path.join(out_dir, f"patient_reports_{volume:05d}.pdf")
+    pdf.output(path)
+    return written, failed, os.path.getsize(path)
+
+
+# Split a list into consecutive batches
+def batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# Export every report, returns a summary dict
+def export_reports(store, key, out_dir, combined=False, per_file=500, batch_size=50, workers=None):
+    os.makedirs(out_dir, exist_ok=True)
+    locations = store.locations()
+    workers = workers or os.cpu_count() or 1
+    if combined:
+        tasks = ((_export_volume, batch, out_dir, volume)
+                 for volume, batch in enumerate(batches(locations, per_file or len(locations) or 1), 1))
+    else:
+        tasks = ((_export_single, batch, out_dir) for batch in batches(locations, batch_size))
+
+    written = failed = size = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(key, os.path.abspath(store.data_path))) as executor:
+        # Keep only a couple of tasks per worker in flight
+        pending = set()
+        for task in tasks:
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    w, f, s = future.result()
+                    written, failed, size = written + w, failed + f, size + s
+            pending.add(executor.submit(*task))
+        for future in pending:
+            w, f, s = future.result()
+            written, failed, size = written + w, failed + f, size + s
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in KB on Linux
+    peak_self = peak_worker = None
+    if resource is not None:
+        peak_self = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        peak_worker = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return {
+        "reports": written,
+        "failed": failed,
+        "seconds": elapsed,
+        "reports_per_second": written / elapsed if elapsed else 0.0,
+        "megabytes_written": size / 1e6,
+        "peak_rss_main_mb": peak_self,
+        "peak_rss_worker_mb": peak_worker,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export PDF reports for every patient.")
+    parser.add_argument("out_dir", help="directory for the PDF files")
+    parser.add_argument("--combined", action="store_true", help="write paginated volumes instead of one PDF per patient")
+    parser.add_argument("--per-file", type=int, default=500, help="patients per combined volume (0 = a single document)")
+    parser.add_argument("--batch-size", type=int, default=50, help="patients per worker task in single mode")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--store", default="hdisrep", help="report store path without extension")
+    parser.add_argument("--key", default="secret.key", help="encryption key file, one key per line")
+    args = parser.parse_args()
+
+    keys = KeyRing(args.key)
+    # Read only, so the app can keep saving reports during an export
+    store = ReportStore(args.store, keys, read_only=True)
+    summary = export_reports(store, keys.data, args.out_dir, combined=args.combined, per_file=args.per_file,
+                             batch_size=args.batch_size, workers=args.workers)
+    print(f"Exported {summary['reports']} reports ({summary['failed']} failed) in {summary['seconds']:.2f}s, "
+          f"{summary['reports_per_second']:.0f} reports/s, {summary['megabytes_written']:.1f} MB written")
+    if summary["peak_rss_main_mb"] is not None:
+        print(f"Peak memory: main {summary['peak_rss_main_mb']:.0f} MB, largest worker {summary['peak_rss_worker_mb']:.0f} MB")
@@ -1,11 +1,17 @@
 # generate_key.py
+import os
+import sys
 from cryptography.fernet import Fernet
 
 """
 - Generates a key and saves it into a file named secret.key for accessing data from hdisres.json file.
+- An existing secret.key is never overwritten (its reports would become unreadable); use
+  rotate_key.py --new-key to move to a new key.
 """
-    
+
 if __name__ == '__main__':
+    if os.path.exists('secret.key'):
+        sys.exit("secret.key already exists; run 'python rotate_key.py --new-key' to rotate it.")
     key = Fernet.generate_key()
     with open('secret.key', 'wb') as key_file:
         key_file.write(key)
@@ -0,0 +1,204 @@
+import atexit
+import cProfile
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+
+"""
+- Lightweight timing spans for the app's stages (form, lookup, store, model).
+- Off by default: span() then returns a shared no-op context manager (~0.5 us) and timed()
+  functions make one flag check (~0.2 us); timed() is the one to use on hot paths.
+- HDA_TIMING=1 keeps a rolling window of durations per span (count, mean, p50/p95/p99),
+  printed at exit and also written as JSON to HDA_TIMING_REPORT if set.
+- HDA_PROFILE=<file.prof> also runs every outermost span under cProfile and writes the
+  combined stats at exit (view with: python -m pstats file.prof).
+- Span names are dotted stage names like 'form.predict' or 'store.decrypt'.
+"""
+
+# Durations kept per span
+WINDOW = 1000
+
+_enabled = False
+_samples = {}
+_counts = {}
+_lock = threading.Lock()
+_local = threading.local()
+_profile_path = None
+_profile_stats = None
+
+
+# Context manager used while instrumentation is off
+class _NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+
+    # Constructor
+    def __init__(self, name):
+        self.name = name
+        self.profiler = None
+
+    def __enter__(self):
+        depth = getattr(_local, "depth", 0)
+        _local.depth = depth + 1
+        if _profile_path is not None and depth == 0:
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another profiler is active on this thread
+                self.profiler = None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        if self.profiler is not None:
+            self.profiler.disable()
+            _add_profile(self.profiler)
+        _local.depth -= 1
+        record(self.name, seconds)
+        return False
+
+
+# Time a block: with span("form.predict"): ...
+def span(name):
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+# Decorator timing every call of a function as one span
+def timed(name):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Add one duration (seconds) to a span's window
+def record(name, seconds):
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=WINDOW)
+        samples.append(seconds)
+        _counts[name] = _counts.get(name, 0) + 1
+
+
+# Merge a finished profile into the combined stats
+def _add_profile(profiler):
+    global _profile_stats
+    with _lock:
+        if _profile_stats is None:
+            _profile_stats = pstats.Stats(profiler)
+        else:
+            _profile_stats.add(profiler)
+
+
+# Whether spans are being recorded
+def enabled():
+    return _enabled
+
+
+# Turn recording on (optionally with cProfile capture) or off at runtime
+def enable(on=True, profile_path=None):
+    global _enabled, _profile_path
+    _enabled = on
+    _profile_path = profile_path if on else None
+
+
+# Forget every recorded duration and profile
+def reset():
+    global _profile_stats
+    with _lock:
+        _samples.clear()
+        _counts.clear()
+        _profile_stats = None
+
+
+# Percentile of a sorted list (nearest rank)
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+# Rolling summary per span, in milliseconds
+def summary():
+    with _lock:
+        items = [(name, list(samples), _counts[name]) for name, samples in _samples.items()]
+    result = {}
+    for name, samples, count in sorted(items):
+        ordered = sorted(samples)
+        result[name] = {
+            "count": count,
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+            "p50_ms": round(_percentile(ordered, 50) * 1000, 3),
+            "p95_ms": round(_percentile(ordered, 95) * 1000, 3),
+            "p99_ms": round(_percentile(ordered, 99) * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        }
+    return result
+
+
+# Summary as an aligned text table
+def format_summary():
+    rows = summary()
+    if not rows:
+        return "No timings recorded."
+    lines = [f"{'span':<28}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+    for name, row in rows.items():
+        lines.append(f"{name:<28}{row['count']:>7}{row['mean_ms']:>10.2f}{row['p50_ms']:>10.2f}"
+                     f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}")
+    return "\n".join(lines)
+
+
+# Write the summary as JSON
+def export(path):
+    with open(path, "w") as f:
+        json.dump({"created": time.time(), "pid": os.getpid(), "spans": summary()}, f, indent=2)
+
+
+# Write the combined cProfile stats, returns False if nothing was captured
+def dump_profile(path):
+    with _lock:
+        if _profile_stats is None:
+            return False
+        _profile_stats.dump_stats(path)
+        return True
+
+
+# Print and save everything at exit
+def _report_at_exit():
+    if not _counts:
+        return
+    print("Timing summary:")
+    print(format_summary())
+    report_path = os.environ.get("HDA_TIMING_REPORT")
+    if report_path:
+        export(report_path)
+    if _profile_path is not None and dump_profile(_profile_path):
+        print(f"cProfile stats saved to {_profile_path}")
+
+
+# Opt in from the environment
+if os.environ.get("HDA_TIMING") or os.environ.get("HDA_PROFILE"):
+    enable(True, os.environ.get("HDA_PROFILE") or None)
+    atexit.register(_report_at_exit)
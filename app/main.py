@@ -1,28 +1,77 @@
 # main.py
+import time
+START_TIME = time.perf_counter()
+
+import importlib
+import json
+import os
 import tkinter as tk
 from tkinter import ttk
-from tabs.PatientFormTab import PatientFormTab
-from tabs.GetPatientInfoTab import GetPatientInfoTab
-from tabs.ViewGraphTab import ViewGraphTab
-from model.Model import Model
+from model.ModelLoader import ModelLoader
+import instrumentation
 
 """
 - Main GUI application integrating all the tabs and the model.
-- The model is instantiated and trained here.
+- The window is painted first: tabs (and their heavy imports) are built when first selected,
+  and the model is loaded or trained on a background thread.
+- A startup timing report is printed once the first tab and the model are ready
+  (also written as JSON to the path in HDA_STARTUP_REPORT if set).
+- HDA_MODEL_BACKEND selects the model backend: tree (default), forest or boosting.
+- HDA_COMPILED_MODEL=1 uses the tree exported by export_predictor.py, without sklearn or pandas
+  (also used automatically when they are not installed).
+- With HDA_TIMING=1 (see instrumentation.py) F12 shows the rolling latency of every stage.
 """
 
+# Tab title, module, class, whether it needs the model
+TABS = [
+    ("Patient Form", "tabs.PatientFormTab", "PatientFormTab", True),
+    ("Get Patient Info", "tabs.GetPatientInfoTab", "GetPatientInfoTab", False),
+    ("View Graph", "tabs.ViewGraphTab", "ViewGraphTab", True),
+]
+
+
+# Records startup milestones relative to process start
+class StartupTimer:
+
+    # Constructor
+    def __init__(self, start=START_TIME):
+        self.start = start
+        self.marks = {}
+        self.reported = False
+
+    # Record milestone once
+    def mark(self, name):
+        self.marks.setdefault(name, time.perf_counter() - self.start)
+
+    # Print milestones and optionally save them as JSON
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+        print("Startup timing:")
+        for name, seconds in sorted(self.marks.items(), key=lambda item: item[1]):
+            print(f"  {name:<20} {seconds * 1000:8.1f} ms")
+        report_path = os.environ.get("HDA_STARTUP_REPORT")
+        if report_path:
+            with open(report_path, "w") as f:
+                json.dump({name: round(seconds, 6) for name, seconds in self.marks.items()}, f, indent=2)
+
 
 class HeartDiseaseAnalyzerApp:
 
     # Main App Constructor
-    def __init__(self, root, model):
+    def __init__(self, root, model, timer=None):
         self.root = root
-        self.model = model 
+        self.model = model
+        self.timer = timer or StartupTimer()
         self.root.title("Heart Disease Analyzer")
         self.root.geometry("768x1024")
         self.root.resizable(False, False)
         self.center_window()
 
+        # App wide theme
+        ttk.Style().theme_use('clam')
+
         # Header title
         tk.Label(
             root,
@@ -34,10 +83,23 @@ class HeartDiseaseAnalyzerApp:
             pady=10,
         ).pack(fill="x")
 
+        # Model status bar
+        self.status_label = ttk.Label(root, text="Loading model...", anchor="w", padding=(20, 2))
+        self.status_label.pack(side="bottom", fill="x")
+
         # Add Tabs
         self.tab_control = ttk.Notebook(root)
         self.tab_control.pack(expand=1, fill="both", padx=20, pady=10)
         self.add_tabs()
+        self.timer.mark("window created")
+
+        # Stage timings window
+        if instrumentation.enabled():
+            self.root.bind("<F12>", self.show_timings)
+
+        # Build the first tab once the window is on screen
+        self.root.after(0, self.first_paint)
+        self.root.after(50, self.check_model)
 
     # Center window on screen
     def center_window(self):
@@ -47,20 +109,82 @@ class HeartDiseaseAnalyzerApp:
         window_y = (screen_height // 2) - (1024 // 2)
         self.root.geometry(f"+{window_x}+{window_y}")
 
-    # Init the tabs
+    # Init the tabs as empty placeholders, built on first selection
     def add_tabs(self):
-        patient_form_tab = PatientFormTab(self.tab_control, self.model)
-        self.tab_control.add(patient_form_tab.frame, text="Patient Form")
+        self.placeholders = []
+        self.tabs = [None] * len(TABS)
+        for title, _, _, _ in TABS:
+            placeholder = ttk.Frame(self.tab_control)
+            self.tab_control.add(placeholder, text=title)
+            self.placeholders.append(placeholder)
+
+    # Import and construct a tab inside its placeholder
+    def build_tab(self, index):
+        if self.tabs[index] is not None:
+            return
+        title, module_name, class_name, needs_model = TABS[index]
+        tab_class = getattr(importlib.import_module(module_name), class_name)
+        placeholder = self.placeholders[index]
+        tab = tab_class(placeholder, self.model) if needs_model else tab_class(placeholder)
+        tab.frame.pack(expand=1, fill="both")
+        self.tabs[index] = tab
+
+    # Build the selected tab the first time it is shown
+    def on_tab_changed(self, event=None):
+        self.build_tab(self.tab_control.index(self.tab_control.select()))
+
+    # Window is painted, now build the visible tab
+    def first_paint(self):
+        self.root.update_idletasks()
+        self.timer.mark("first paint")
+        self.on_tab_changed()
+        self.tab_control.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.timer.mark("first tab ready")
+        self.maybe_report()
+
+    # Poll the background model loader
+    def check_model(self):
+        if not self.model.ready.is_set():
+            self.root.after(50, self.check_model)
+            return
+        self.timer.mark("model ready")
+        if self.model.error is not None:
+            self.status_label.config(text=f"Model could not be loaded: {self.model.error}")
+        else:
+            self.status_label.config(text=f"Model ready ({self.model.load_seconds * 1000:.0f} ms)")
+        self.maybe_report()
+
+    # Show the rolling latency summary, refreshed every second while open
+    def show_timings(self, event=None):
+        window = tk.Toplevel(self.root)
+        window.title("Stage Timings")
+        text = tk.Text(window, width=78, height=24, font=("Courier", 10))
+        text.pack(expand=1, fill="both")
+
+        def refresh():
+            if not window.winfo_exists():
+                return
+            text.config(state="normal")
+            text.delete("1.0", tk.END)
+            text.insert(tk.END, instrumentation.format_summary())
+            text.config(state="disabled")
+            window.after(1000, refresh)
 
-        get_patient_info_tab = GetPatientInfoTab(self.tab_control)
-        self.tab_control.add(get_patient_info_tab.frame, text="Get Patient Info")
+        refresh()
 
-        view_graph_tab = ViewGraphTab(self.tab_control)
-        self.tab_control.add(view_graph_tab.frame, text="View Graph")
+    # Report once both the first tab and the model are ready
+    def maybe_report(self):
+        if "first tab ready" in self.timer.marks and "model ready" in self.timer.marks:
+            self.timer.report()
 
 # Main function
 if __name__ == "__main__":
+    timer = StartupTimer()
+    timer.mark("imports done")
     root = tk.Tk()
-    model = Model()
-    app = HeartDiseaseAnalyzerApp(root, model)
+    model = ModelLoader(
+        compiled=os.environ.get("HDA_COMPILED_MODEL") == "1",
+        backend=os.environ.get("HDA_MODEL_BACKEND", "tree"),
+    )
+    app = HeartDiseaseAnalyzerApp(root, model, timer)
     root.mainloop()
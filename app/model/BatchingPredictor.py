@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+
+"""
+- Thread safe micro-batching layer on top of the Model.
+- Requests arriving within window_ms of each other (or until max_batch) are encoded and
+  predicted in one vectorized call, and each caller's Future gets its own result.
+- encode turns a list of request items into the feature matrix; by default items are
+  already encoded 13-feature rows.
+- A batch with a bad item is predicted again one item at a time, on the executor when one is
+  given, so the batching thread goes on with the next batch.
+"""
+
+
+# Default encoder: items are feature rows
+def encode_rows(items):
+    return np.asarray(items, dtype=np.float64)
+
+
+class BatchingPredictor:
+
+    # Constructor, starts the batching thread
+    def __init__(self, model, encode=encode_rows, max_batch=64, window_ms=2.0, executor=None):
+        self.model = model
+        self.encode = encode
+        self.executor = executor
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.pending = []
+        self.closed = False
+        self.condition = threading.Condition()
+        self.batch_sizes = deque(maxlen=10000)
+        self.thread = threading.Thread(target=self.run, name="batching-predictor", daemon=True)
+        self.thread.start()
+
+    # Queue one item, returns a Future resolving to its prediction
+    def submit(self, item):
+        future = Future()
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("BatchingPredictor is closed.")
+            self.pending.append((item, future))
+            if len(self.pending) == 1 or len(self.pending) >= self.max_batch:
+                self.condition.notify()
+        return future
+
+    # Predict one item, blocking until its batch has run
+    def predict(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    # Stop after the queued items are predicted
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    # Batching loop: wait for a first item, then for more until the window closes or the batch is full
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                deadline = time.monotonic() + self.window
+                while len(self.pending) < self.max_batch and not self.closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                batch = self.pending[:self.max_batch]
+                del self.pending[:self.max_batch]
+            self.batch_sizes.append(len(batch))
+            self.resolve(batch)
+
+    # Run one vectorized predict and resolve the futures
+    def resolve(self, batch):
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            predictions = self.model.predict(self.encode([item for item, _ in batch]))
+        except ValueError:
+            # A bad item, predict one by one so only its caller gets the error
+            if self.executor is not None:
+                self.executor.submit(self.resolve_each, batch)
+            else:
+                self.resolve_each(batch)
+            return
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), prediction in zip(batch, predictions):
+            future.set_result(prediction)
+
+    # Predict the items of a batch one by one, each future gets its own result or error
+    def resolve_each(self, batch):
+        for item, future in batch:
+            try:
+                future.set_result(self.model.predict(self.encode([item]))[0])
+            except Exception as e:
+                future.set_exception(e)
+
+
+# Throughput against per-row calls, run from app/ with: python -m model.BatchingPredictor
+if __name__ == '__main__':
+    from concurrent.futures import ThreadPoolExecutor
+    from model.Model import Model
+
+    patient = {
+        "Age": "52", "Sex": "Male", "Chest Pain Type (0-3)": "0", "Resting Blood Pressure (mmHg)": "125",
+        "Serum Cholesterol (mg/dL)": "212", "Fasting Blood Sugar > 120 mg/dL": "No", "Resting ECG": "ST-T Wave Abnormality",
+        "Max Heart Rate (BPM)": "168", "Exercise Induced Angina": "No", "ST Depression": "1",
+        "Slope of Peak Exercise ST Segment": "Downsloping", "Number of Major Vessels": "2", "Thalassemia": "Normal",
+    }
+    model = Model()
+    threads, per_thread = 8, 250
+    total = threads * per_thread
+
+    # Per-row path used by the form: encode one patient, predict
+    def per_row(_):
+        for _ in range(per_thread):
+            model.predict(model.encoder.encode(patient))
+
+    # Same work through the batching layer
+    batcher = BatchingPredictor(model, encode=model.encoder.encode)
+
+    def batched(_):
+        for _ in range(per_thread):
+            batcher.predict(patient)
+
+    for name, fn in (("per-row calls", per_row), ("BatchingPredictor", batched)):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(fn, range(threads)))
+        elapsed = time.perf_counter() - start
+        print(f"{name:<18} {total / elapsed:10.0f} predictions/s ({threads} threads, {total} predictions)")
+    sizes = list(batcher.batch_sizes)
+    print(f"Mean batch size {sum(sizes) / len(sizes):.1f}, largest {max(sizes)}")
+    batcher.close()
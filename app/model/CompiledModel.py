@@ -0,0 +1,84 @@
+import csv
+import importlib
+import os
+import sys
+
+"""
+- Stands in for the Model with the predictor generated by export_predictor.py, so predictions
+  need neither sklearn, scipy nor pandas (only NumPy).
+- Same interface as the Model for the form, the server and the batch tools: encoder.encode,
+  predict, predict_batch and the feature/class names.
+- The exported tree is fixed: there is no retraining and no tree_ for the graph tab.
+"""
+
+# Generated by export_predictor.py
+PREDICTOR_MODULE = "model.compiled_predictor"
+
+
+class CompiledModel:
+    # Retraining needs sklearn
+    supports_retraining = False
+
+    # Constructor, imports the generated predictor
+    def __init__(self, module_name=PREDICTOR_MODULE):
+        self.predictor = importlib.import_module(module_name)
+        # The generated module has the same encode() as FeatureEncoder
+        self.encoder = self.predictor
+        self.backend = "tree"
+        self.params = dict(self.predictor.PARAMS)
+        self.artifact_key = self.predictor.ARTIFACT_KEY
+        self.feature_names = list(self.predictor.FEATURE_ORDER)
+        self.class_names = self.predictor.CLASSES
+        self.classifier = None
+        self.cache_dir = os.path.join(os.path.abspath("."), 'model_cache')
+
+    # Get predictions from the exported tree
+    def predict(self, X):
+        return self.predictor.predict(X)
+
+    # Score a CSV of patients chunk by chunk with the csv module, same output as Model.predict_batch
+    def predict_batch(self, input_path, output_path, chunksize=10000):
+        rows = 0
+        with open(input_path, newline="") as f, open(output_path, "w", newline="") as out:
+            reader = csv.DictReader(f)
+            writer = csv.writer(out, lineterminator=os.linesep)
+            writer.writerow(reader.fieldnames + ["Prediction"])
+            while True:
+                chunk = [record for _, record in zip(range(chunksize), reader)]
+                if not chunk:
+                    break
+                try:
+                    features = self.encoder.encode(chunk)
+                except self.predictor.EncodingError as e:
+                    # Row number within the whole file
+                    raise self.predictor.EncodingError(e.label, rows + e.row if e.row else None, e.message)
+                for record, prediction in zip(chunk, self.predict(features).tolist()):
+                    writer.writerow([record[name] for name in reader.fieldnames] + [prediction])
+                rows += len(chunk)
+        return rows
+
+    # Get feature names
+    def get_feature_names(self):
+        return self.feature_names
+
+    # Get the class names of the exported tree
+    def get_class_names(self):
+        return self.class_names
+
+    # No fitted classifier behind the exported tree
+    def get_classifier(self):
+        return self.classifier
+
+
+# Cold start against the full Model, run from app/ with: python -m model.CompiledModel
+if __name__ == '__main__':
+    import subprocess
+    import time
+
+    for name, code in (
+        ("CompiledModel", "from model.CompiledModel import CompiledModel; CompiledModel()"),
+        ("Model", "from model.Model import Model; Model()"),
+    ):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        print(f"{name:<14} process start, import and load: {(time.perf_counter() - start) * 1000:8.1f} ms")
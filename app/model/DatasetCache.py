@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+"""
+- Columnar binary cache of a CSV dataset: the cleaned, typed columns are stored back to back
+  (64-byte aligned) in one 'columns.bin', with names, dtypes and offsets in 'meta.json'.
+- The file is memory-mapped once on load and each column is a view wrapped in a DataFrame
+  without copying (one mapping instead of one .npy per column keeps the load well under 1 ms).
+- meta.json records the size, mtime and sha256 of the source CSV; the cache is rebuilt
+  automatically when the CSV changes (a touched but identical CSV only rehashes).
+- Cleaning matches what the app and test scripts did on every start: fillna(mean()).
+"""
+
+# Bump whenever the cache layout or the cleaning changes
+CACHE_VERSION = 1
+
+# Column alignment inside columns.bin
+ALIGNMENT = 64
+
+
+class DatasetCache:
+
+    # Constructor, the cache of 'data/heart.csv' lives in '<cache_dir>/heart.npcache'
+    def __init__(self, csv_path, cache_dir):
+        self.csv_path = csv_path
+        name = os.path.splitext(os.path.basename(csv_path))[0]
+        self.cache_dir = os.path.join(cache_dir, f"{name}.npcache")
+        self.meta_path = os.path.join(self.cache_dir, "meta.json")
+        self.data_path = os.path.join(self.cache_dir, "columns.bin")
+
+    # sha256 of the source CSV
+    @staticmethod
+    def checksum(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    # Parse and clean the CSV the way the app always has
+    @staticmethod
+    def read_csv(path):
+        data = pd.read_csv(path)
+        return data.fillna(data.mean())
+
+    # Cleaned dataset, memory-mapped from the cache (rebuilt first if the CSV changed)
+    def load(self):
+        meta = self.fresh_meta()
+        if meta is None:
+            data = self.read_csv(self.csv_path)
+            try:
+                self.build(data)
+            except (OSError, ValueError) as e:
+                print(f"Could not write dataset cache '{self.cache_dir}': {e}")
+            return data
+        raw = np.memmap(self.data_path, dtype=np.uint8, mode='r') if meta["rows"] else np.empty(0, np.uint8)
+        columns = {}
+        for column in meta["columns"]:
+            dtype = np.dtype(column["dtype"])
+            end = column["offset"] + meta["rows"] * dtype.itemsize
+            columns[column["name"]] = raw[column["offset"]:end].view(dtype)
+        return pd.DataFrame(columns, copy=False)
+
+    # Cache metadata if it matches the CSV, otherwise None
+    def fresh_meta(self):
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("version") != CACHE_VERSION:
+            return None
+        stat = os.stat(self.csv_path)
+        if meta["size"] == stat.st_size and meta["mtime_ns"] == stat.st_mtime_ns:
+            return meta
+        if meta["size"] != stat.st_size or meta["sha256"] != self.checksum(self.csv_path):
+            return None
+        # Same contents with a new mtime (copied or touched), remember the new stat
+        meta["mtime_ns"] = stat.st_mtime_ns
+        try:
+            self.write_meta(meta)
+        except OSError:
+            pass
+        return meta
+
+    # Write every column, then the metadata that marks the cache complete
+    def build(self, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Invalidate first so a crash mid-build never leaves a stale but valid-looking cache
+        if os.path.exists(self.meta_path):
+            os.remove(self.meta_path)
+        stat = os.stat(self.csv_path)
+        meta = {
+            "version": CACHE_VERSION,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": self.checksum(self.csv_path),
+            "rows": len(data),
+            "columns": [],
+        }
+        # Replace rather than overwrite, a file mapped by another process stays valid
+        tmp_path = f"{self.data_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            for name in data.columns:
+                values = np.ascontiguousarray(data[name].to_numpy())
+                if values.dtype.hasobject:
+                    raise ValueError(f"Column '{name}' is not numeric.")
+                padding = -f.tell() % ALIGNMENT
+                f.write(b"\0" * padding)
+                offset = f.tell()
+                f.write(values.tobytes())
+                meta["columns"].append({"name": name, "dtype": values.dtype.str, "offset": offset})
+        os.replace(tmp_path, self.data_path)
+        self.write_meta(meta)
+
+    # Replace meta.json atomically
+    def write_meta(self, meta):
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, self.meta_path)
+
+
+# Load time against parsing the CSV, run from app/ with: python -m model.DatasetCache
+if __name__ == '__main__':
+    import tempfile
+    import time
+
+    csv_path = os.path.join("data", "heart.csv")
+    cache = DatasetCache(csv_path, tempfile.mkdtemp())
+    cache.load()
+    runs = 200
+    for name, fn in (("read_csv + fillna", lambda: DatasetCache.read_csv(csv_path)), ("memory-mapped cache", cache.load)):
+        start = time.perf_counter()
+        for _ in range(runs):
+            data = fn()
+        print(f"{name:<20} {(time.perf_counter() - start) / runs * 1000:8.3f} ms per load")
+    print("Identical:", DatasetCache.read_csv(csv_path).equals(cache.load()))
@@ -0,0 +1,164 @@
+import numpy as np
+from scipy.special import expit
+
+"""
+- Evaluates a fitted RandomForestClassifier or binary HistGradientBoostingClassifier from its
+  tree arrays, walking every tree of the ensemble at once, one level at a time.
+- sklearn predicts tree by tree with per-call validation and thread start-up, which costs
+  milliseconds for a single patient; large batches still go to sklearn, which is faster there.
+- Same dtypes and summation order as sklearn (float32 inputs for the forest, float64 for
+  boosting, trees added in order), so results are identical.
+"""
+
+# Marker for a missing child
+TREE_LEAF = -1
+
+# Batches at least this large are predicted by sklearn (crossover measured on one core)
+SKLEARN_MIN_ROWS = {"forest": 512, "boosting": 64}
+
+
+class EnsembleEvaluator:
+
+    # Constructor, stacks the trees of the ensemble into one set of node arrays
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self.classes = classifier.classes_
+        self.n_features = classifier.n_features_in_
+        if hasattr(classifier, "estimators_"):
+            self.kind = "forest"
+            self.dtype = np.float32
+            self.stack_forest(classifier)
+        elif hasattr(classifier, "_predictors"):
+            if classifier.n_trees_per_iteration_ != 1:
+                raise ValueError("Only binary gradient boosting classifiers are supported.")
+            self.kind = "boosting"
+            self.dtype = np.float64
+            self.stack_boosting(classifier)
+        else:
+            raise ValueError(f"Unsupported ensemble {type(classifier).__name__}.")
+
+    # Node arrays of every tree of a random forest, with each node's class probabilities
+    def stack_forest(self, classifier):
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in classifier.estimators_:
+            tree = estimator.tree_
+            # Normalized like DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :].copy()
+            normalizer = proba.sum(axis=1)[:, None]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+            self.append_tree(features, thresholds, lefts, rights, roots, offset,
+                             tree.feature, tree.threshold, tree.children_left, tree.children_right)
+            probas.append(proba)
+            offset += tree.node_count
+        self.concatenate(features, thresholds, lefts, rights, roots)
+        self.node_value = np.concatenate(probas)
+        self.max_depth = max(estimator.tree_.max_depth for estimator in classifier.estimators_)
+
+    # Node arrays of every tree of a binary gradient boosting model, with each leaf's raw value
+    def stack_boosting(self, classifier):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        self.max_depth = 0
+        for (predictor,) in classifier._predictors:
+            nodes = predictor.nodes
+            leaf = nodes["is_leaf"].astype(bool)
+            self.append_tree(features, thresholds, lefts, rights, roots, offset,
+                             nodes["feature_idx"], nodes["num_threshold"],
+                             np.where(leaf, TREE_LEAF, nodes["left"].astype(np.intp)),
+                             np.where(leaf, TREE_LEAF, nodes["right"].astype(np.intp)))
+            values.append(nodes["value"].astype(np.float64))
+            self.max_depth = max(self.max_depth, int(nodes["depth"].max()))
+            offset += len(nodes)
+        self.concatenate(features, thresholds, lefts, rights, roots)
+        self.node_value = np.concatenate(values)
+        self.baseline = float(classifier._baseline_prediction.ravel()[0])
+
+    # Add one tree, shifting its child indices by offset
+    @staticmethod
+    def append_tree(features, thresholds, lefts, rights, roots, offset, feature, threshold, left, right):
+        left = np.asarray(left, dtype=np.intp)
+        right = np.asarray(right, dtype=np.intp)
+        features.append(np.asarray(feature, dtype=np.intp))
+        thresholds.append(np.asarray(threshold, dtype=np.float64))
+        lefts.append(np.where(left == TREE_LEAF, TREE_LEAF, left + offset))
+        rights.append(np.where(right == TREE_LEAF, TREE_LEAF, right + offset))
+        roots.append(offset)
+
+    # Join the per-tree arrays
+    def concatenate(self, features, thresholds, lefts, rights, roots):
+        self.feature = np.concatenate(features)
+        self.threshold = np.concatenate(thresholds)
+        self.children_left = np.concatenate(lefts)
+        self.children_right = np.concatenate(rights)
+        self.roots = np.array(roots, dtype=np.intp)
+
+    # Validate input and convert it to a matrix of the ensemble's dtype
+    def _as_matrix(self, X):
+        X = np.asarray(X, dtype=self.dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got input with shape {X.shape}")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity.")
+        return X
+
+    # Leaf reached in every tree by every row, shape (n_trees, n_rows)
+    def apply(self, X):
+        X = self._as_matrix(X)
+        cols = np.arange(len(X))
+        node = np.repeat(self.roots[:, None], len(X), axis=1)
+        for _ in range(self.max_depth):
+            left = self.children_left[node]
+            internal = left != TREE_LEAF
+            if not internal.any():
+                break
+            go_left = X[cols, self.feature[node]] <= self.threshold[node]
+            node = np.where(internal, np.where(go_left, left, self.children_right[node]), node)
+        return node
+
+    # Predict one row or a matrix of rows
+    def predict(self, X):
+        X = self._as_matrix(X)
+        if len(X) >= SKLEARN_MIN_ROWS[self.kind]:
+            return self.classifier.predict(X)
+        leaves = self.apply(X)
+        if self.kind == "forest":
+            # Reducing over the leading axis adds the trees one after another, like sklearn
+            proba = np.add.reduce(self.node_value[leaves], axis=0) / len(self.roots)
+            return self.classes.take(np.argmax(proba, axis=1))
+        raw = np.add.reduce(
+            np.concatenate([np.full((1, leaves.shape[1]), self.baseline), self.node_value[leaves]]), axis=0
+        )
+        positive = expit(raw)
+        return self.classes.take((positive > 1 - positive).astype(np.intp))
+
+
+# Parity and microbenchmark against sklearn, run from app/ with: python -m model.EnsembleEvaluator
+if __name__ == '__main__':
+    import timeit
+    from model.Model import Model
+
+    for backend in ("forest", "boosting"):
+        model = Model(backend=backend)
+        classifier = model.get_classifier()
+        evaluator = EnsembleEvaluator(classifier)
+        X, _ = model.get_training_data()
+        X = X.to_numpy(dtype=np.float64)
+        # Random rows around the data range as well, to reach unusual leaves
+        rng = np.random.default_rng(0)
+        noisy = X[rng.integers(0, len(X), 20000)] + rng.normal(0, 1, (20000, X.shape[1]))
+        for rows in (X, noisy):
+            # Small chunks so the NumPy walk is used, not the sklearn path
+            ours = np.concatenate([evaluator.predict(rows[i:i + 32]) for i in range(0, len(rows), 32)])
+            assert np.array_equal(ours, classifier.predict(rows))
+        assert all(evaluator.predict(row)[0] == classifier.predict(row.reshape(1, -1))[0] for row in X[:200])
+
+        row = X[0]
+        sklearn_us = min(timeit.repeat(lambda: classifier.predict(row.reshape(1, -1)), number=20, repeat=3)) / 20 * 1e6
+        single_us = min(timeit.repeat(lambda: evaluator.predict(row), number=200, repeat=3)) / 200 * 1e6
+        small_us = min(timeit.repeat(lambda: evaluator.predict(X[:32]), number=20, repeat=3)) / 20 * 1e6
+        print(f"{backend:<9} parity ok, 1 row: {single_us:8.1f} us (sklearn {sklearn_us:8.1f} us), "
+              f"32 rows: {small_us:8.1f} us")
@@ -0,0 +1,113 @@
+import numpy as np
+from model.features import FEATURE_ORDER, LABEL_TO_FEATURE, VALUE_MAPPING
+
+"""
+- Precompiled encoder from GUI labels (or dataset feature names) to the model's 13 features.
+- Lookup tables are built once; a batch is encoded column by column into one float matrix.
+- Accepts a single dict, a list of dicts or a DataFrame. Errors name the column and the row.
+"""
+
+
+class EncodingError(ValueError):
+
+    # Constructor, row is 1-based within the encoded batch
+    def __init__(self, label, row, message):
+        super().__init__(f"{message} (row {row})" if row is not None else message)
+        self.message = message
+        self.label = label
+        self.row = row
+
+
+class FeatureEncoder:
+
+    # Constructor, builds the per-column lookup tables
+    def __init__(self, label_to_feature=LABEL_TO_FEATURE, value_mapping=VALUE_MAPPING, feature_order=FEATURE_ORDER):
+        self.feature_order = list(feature_order)
+        feature_to_label = {feature: label for label, feature in label_to_feature.items()}
+        self.columns = []
+        for feature in self.feature_order:
+            label = feature_to_label[feature]
+            mapping = value_mapping.get(label)
+            if mapping is not None:
+                mapping = dict(mapping)
+                # Digit labels ("0"-"3") also match numbers, e.g. from JSON or a parsed CSV
+                for key, value in list(mapping.items()):
+                    if key.isdigit():
+                        mapping.setdefault(int(key), value)
+            self.columns.append((label, feature, mapping))
+
+    # Encode one dict, a list of dicts or a DataFrame into an (n, 13) float64 matrix
+    def encode(self, data):
+        if isinstance(data, dict):
+            data = [data]
+        if hasattr(data, "columns"):
+            return self.encode_columns(
+                len(data), lambda name: data[name].tolist() if name in data.columns else None
+            )
+
+        records = list(data)
+        if not records:
+            return np.empty((0, len(self.columns)))
+        first = records[0]
+        if not isinstance(first, dict):
+            raise EncodingError(None, 1, "Each patient must be a dict of form values")
+
+        # Column source is chosen from the first record, a missing key in a later one is an error
+        def column(name):
+            if name not in first:
+                return None
+            try:
+                return [record[name] for record in records]
+            except KeyError:
+                row = next(i for i, record in enumerate(records, 1) if name not in record)
+                raise EncodingError(name, row, f"Missing value for {name}")
+            except TypeError:
+                row = next(i for i, record in enumerate(records, 1) if not isinstance(record, dict))
+                raise EncodingError(None, row, "Each patient must be a dict of form values")
+        return self.encode_columns(len(records), column)
+
+    # Fill the matrix one column at a time; get_column(name) returns a list or None
+    def encode_columns(self, n_rows, get_column):
+        out = np.empty((n_rows, len(self.columns)), dtype=np.float64)
+        for j, (label, feature, mapping) in enumerate(self.columns):
+            name, values = label, get_column(label)
+            if values is not None and mapping is not None:
+                out[:, j] = self.map_labels(label, mapping, values)
+                continue
+            if values is None:
+                # Already encoded input, e.g. a copy of heart.csv
+                name, values = feature, get_column(feature)
+                if values is None:
+                    raise EncodingError(label, None, f"Missing value for {label}")
+            out[:, j] = self.to_numbers(name, values)
+        return out
+
+    # Map label strings through the lookup table
+    @staticmethod
+    def map_labels(label, mapping, values):
+        codes = [mapping.get(value) for value in values]
+        if None in codes:
+            # Slow path only for rows that missed: tolerate whitespace and non-string values
+            for i, code in enumerate(codes):
+                if code is None:
+                    code = mapping.get(str(values[i]).strip())
+                    if code is None:
+                        raise EncodingError(label, i + 1, f"Invalid value for {label}: {values[i]!r}")
+                    codes[i] = code
+        return codes
+
+    # Convert numeric strings or numbers, naming the first bad row
+    @staticmethod
+    def to_numbers(label, values):
+        try:
+            numbers = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            numbers = None
+        if numbers is None or np.isnan(numbers).any():
+            for i, value in enumerate(values):
+                try:
+                    if np.isnan(float(value)):
+                        raise ValueError
+                except (TypeError, ValueError):
+                    raise EncodingError(label, i + 1, f"Invalid input for {label}: must be a number, got {value!r}")
+        return numbers
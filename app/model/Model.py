@@ -1,21 +1,48 @@
+import hashlib
+import json
 import os
 import sys
+import joblib
 import pandas as pd
 import numpy as np
+import sklearn
 from sklearn.model_selection import train_test_split
-from sklearn.tree import DecisionTreeClassifier
+from model.DatasetCache import DatasetCache
+from model.compaction import compact_dataset, compact_xy
+from model.PruningPath import PruningPath
+from model.FeatureEncoder import EncodingError, FeatureEncoder
+from model.backends import BACKEND_PARAMS, fit_classifier, make_evaluator
+from instrumentation import span, timed
+
+# Bump whenever the layout of the saved model artifact changes
+ARTIFACT_VERSION = 2
+
+# Classifier used unless another backend is selected
+DEFAULT_BACKEND = "tree"
 
 class Model:
+    # Confirmed reports can be added to the training data (see Retrainer)
+    supports_retraining = True
+
     # Model constructor
-    def __init__(self):
+    def __init__(self, params=None, cache_dir=None, backend=DEFAULT_BACKEND):
+        if backend not in BACKEND_PARAMS:
+            raise ValueError(f"Unknown model backend '{backend}', expected one of {', '.join(BACKEND_PARAMS)}.")
         self.dataset = None
         self.X = None
         self.y = None
+        self.sample_weight = None
         self.feature_names = None
         self.class_names = None
         self.classifier = None
-        self.load_dataset(self.resource_path('data/heart.csv')) 
-        self.train_model()
+        self.evaluator = None
+        self.encoder = FeatureEncoder()
+        self.backend = backend
+        self.params = dict(BACKEND_PARAMS[backend] if params is None else params)
+        self.data_path = self.resource_path('data/heart.csv')
+        self.cache_dir = cache_dir or self.cache_path('model_cache')
+        self.artifact_key = None
+        self.load_or_train()
 
     # Resolve resource path for PyInstaller
     @staticmethod
@@ -24,23 +51,129 @@ class Model:
             return os.path.join(sys._MEIPASS, relative_path)
         return os.path.join(os.path.abspath("."), relative_path)
 
-    # Load dataset from heart.csv
+    # Resolve writable path (the PyInstaller bundle is read only)
+    @staticmethod
+    def cache_path(relative_path):
+        return os.path.join(os.path.abspath("."), relative_path)
+
+    # Hash dataset contents, backend, hyperparameters and library version into the artifact key
+    @staticmethod
+    def compute_artifact_key(data_path, params, backend=DEFAULT_BACKEND):
+        digest = hashlib.sha256()
+        with open(data_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b''):
+                digest.update(block)
+        digest.update(json.dumps({"backend": backend, "params": params}, sort_keys=True).encode('utf-8'))
+        digest.update(f"{ARTIFACT_VERSION}:{sklearn.__version__}".encode('utf-8'))
+        return digest.hexdigest()
+
+    # Path of the artifact for the current key
+    def artifact_path(self):
+        return os.path.join(self.cache_dir, f"heart_{self.backend}-{self.artifact_key[:16]}.joblib")
+
+    # Load the saved classifier if the dataset and params are unchanged, otherwise train and save
+    @timed("model.load_or_train")
+    def load_or_train(self):
+        self.artifact_key = self.compute_artifact_key(self.data_path, self.params, self.backend)
+        artifact_path = self.artifact_path()
+        if os.path.exists(artifact_path):
+            try:
+                self.load_artifact(artifact_path)
+                return
+            except Exception as e:
+                print(f"Could not load model artifact '{artifact_path}', retraining: {e}")
+
+        self.load_dataset(self.data_path)
+        self.train_model()
+        try:
+            self.save_artifact(artifact_path)
+        except OSError as e:
+            print(f"Could not save model artifact '{artifact_path}': {e}")
+
+    # Load classifier and metadata from artifact
+    @timed("model.load_artifact")
+    def load_artifact(self, artifact_path):
+        artifact = joblib.load(artifact_path)
+        if artifact.get("version") != ARTIFACT_VERSION or artifact.get("key") != self.artifact_key:
+            raise ValueError("artifact does not match the current dataset or parameters")
+        self.classifier = artifact["classifier"]
+        self.feature_names = artifact["feature_names"]
+        self.class_names = artifact["class_names"]
+        self.evaluator = make_evaluator(self.classifier)
+
+    # Save classifier and metadata, replacing the file atomically
+    def save_artifact(self, artifact_path):
+        os.makedirs(os.path.dirname(artifact_path), exist_ok=True)
+        artifact = {
+            "version": ARTIFACT_VERSION,
+            "key": self.artifact_key,
+            "backend": self.backend,
+            "params": self.params,
+            "classifier": self.classifier,
+            "feature_names": self.feature_names,
+            "class_names": self.class_names,
+        }
+        tmp_path = f"{artifact_path}.{os.getpid()}.tmp"
+        joblib.dump(artifact, tmp_path)
+        os.replace(tmp_path, artifact_path)
+
+    # Load the cleaned dataset, memory-mapped from the columnar cache of heart.csv,
+    # with duplicate rows collapsed into sample weights
+    @timed("model.load_dataset")
     def load_dataset(self, file_path):
-        self.dataset = pd.read_csv(file_path)
-        self.dataset = self.dataset.fillna(self.dataset.mean())
-        self.X = self.dataset.iloc[:, :-1]
-        self.y = self.dataset.iloc[:, -1]
+        self.dataset = DatasetCache(file_path, self.cache_dir).load()
+        compacted, self.sample_weight = compact_dataset(self.dataset)
+        self.X = compacted.iloc[:, :-1]
+        self.y = compacted.iloc[:, -1]
         self.feature_names = self.X.columns.tolist()
         self.class_names = self.y.unique()
 
-    # Train model using DST with test params from testing files
+    # Train the selected backend (the tree uses the test params from testing files)
+    @timed("model.train")
     def train_model(self):
-        self.classifier = DecisionTreeClassifier(random_state=1, max_depth=9)
-        self.classifier.fit(self.X, self.y)
+        self.classifier = self.fit_classifier(self.X, self.y, self.sample_weight)
+        self.evaluator = make_evaluator(self.classifier)
+
+    # Fit a new classifier of the selected backend and params, without touching the current one
+    def fit_classifier(self, X, y, sample_weight=None):
+        return fit_classifier(self.backend, self.params, X, y, sample_weight)
+
+    # Hot-swap a newly trained classifier; predict keeps running on the old one until the swap
+    def swap_classifier(self, classifier):
+        evaluator = make_evaluator(classifier)
+        # One attribute assignment, so a concurrent predict sees either the old or the new tree
+        self.evaluator = evaluator
+        self.classifier = classifier
 
-    # Get predictions
+    # Cost-complexity pruning path of the current tree, scored by masking instead of refitting
+    def pruning_path(self):
+        if not hasattr(self.classifier, "tree_"):
+            raise ValueError("Cost-complexity pruning is only available for the tree backend.")
+        return PruningPath(self.classifier)
+
+    # Get predictions from the backend's evaluator (same results as classifier.predict)
+    @timed("model.predict")
     def predict(self, X):
-        return self.classifier.predict(X)
+        if hasattr(X, "columns"):
+            X = X[self.feature_names]
+        return self.evaluator.predict(X)
+
+    # Score a CSV of patients chunk by chunk, appending predictions to output_path
+    def predict_batch(self, input_path, output_path, chunksize=10000):
+        rows = 0
+        with open(output_path, "w", newline="") as out:
+            for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunksize, dtype=str, keep_default_na=False)):
+                try:
+                    with span("batch.encode"):
+                        features = self.encoder.encode(chunk)
+                except EncodingError as e:
+                    # Row number within the whole file
+                    raise EncodingError(e.label, rows + e.row if e.row else None, e.message)
+                chunk["Prediction"] = self.predict(features)
+                with span("batch.write"):
+                    chunk.to_csv(out, header=(i == 0), index=False)
+                rows += len(chunk)
+        return rows
 
     # Get feature names
     def get_feature_names(self):
@@ -54,9 +187,30 @@ class Model:
     def get_classifier(self):
         return self.classifier
 
-    # Split data into training and testing
+    # Get the unique heart.csv features and targets (see get_sample_weight for the duplicate counts)
+    def get_training_data(self):
+        # Dataset is not parsed when the classifier came from the artifact
+        if self.X is None:
+            self.load_dataset(self.data_path)
+        return self.X, self.y
+
+    # Number of heart.csv rows behind each unique training row
+    def get_sample_weight(self):
+        self.get_training_data()
+        return self.sample_weight
+
+    # Add cases to the training data, merging them with identical rows, returns (X, y, sample_weight)
+    def extend_training_data(self, X_new, y_new):
+        X, y = self.get_training_data()
+        X_all = pd.concat([X, X_new[X.columns]], ignore_index=True)
+        y_all = pd.concat([y, pd.Series(y_new, name=y.name)], ignore_index=True)
+        weights = np.concatenate((self.sample_weight, np.ones(len(X_new))))
+        return compact_xy(X_all, y_all, weights)
+
+    # Split the unique rows into training and testing, returns the weights of both sides last
     def split_data(self, test_size=0.1):
-        X_train, X_test, y_train, y_test = train_test_split(
-            self.X, self.y, test_size=test_size, random_state=1
+        self.get_training_data()
+        X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(
+            self.X, self.y, self.sample_weight, test_size=test_size, random_state=1
         )
-        return X_train, X_test, y_train, y_test
+        return X_train, X_test, y_train, y_test, w_train, w_test
@@ -0,0 +1,57 @@
+import threading
+import time
+
+"""
+- Loads (or trains) the Model on a background thread so the window can paint first.
+- Stands in for the Model: attribute access waits until loading has finished.
+- sklearn and pandas are only imported by the loading thread.
+- With compiled=True, or when sklearn/pandas are not installed (a build that leaves them out),
+  the exported predictor is loaded instead (CompiledModel, see export_predictor.py).
+"""
+
+
+class ModelLoader:
+
+    # Constructor, starts loading right away
+    def __init__(self, compiled=False, **model_kwargs):
+        self.compiled = compiled
+        self.model_kwargs = model_kwargs
+        self.model = None
+        self.error = None
+        self.load_seconds = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.load, name="model-loader", daemon=True)
+        self.thread.start()
+
+    # Import and build the model, runs on the loader thread
+    def load(self):
+        start = time.perf_counter()
+        try:
+            if not self.compiled:
+                try:
+                    from model.Model import Model
+                except ImportError as e:
+                    print(f"Full model unavailable ({e}), using the compiled predictor")
+                    self.compiled = True
+            if self.compiled:
+                from model.CompiledModel import CompiledModel
+                self.model = CompiledModel()
+            else:
+                self.model = Model(**self.model_kwargs)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.load_seconds = time.perf_counter() - start
+            self.ready.set()
+
+    # Block until the model is loaded, re-raising a loading error
+    def get(self, timeout=None):
+        if not self.ready.wait(timeout):
+            raise TimeoutError("Model is still loading.")
+        if self.error is not None:
+            raise RuntimeError(f"Model could not be loaded: {self.error}")
+        return self.model
+
+    # Forward everything else (predict, get_feature_names, ...) to the loaded model
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
@@ -0,0 +1,155 @@
+import numpy as np
+from model.TreeEvaluator import TreeEvaluator, TREE_LEAF
+
+"""
+- Minimal cost-complexity pruning path of a fitted DecisionTreeClassifier, computed from its
+  tree_ arrays (same weakest-link pruning as sklearn's ccp_alpha).
+- Every internal node gets the alpha at which it collapses into a leaf; the subtree pruned at
+  any alpha is then a mask over the existing arrays, so the whole alpha / depth / leaves /
+  score curve is scored without refitting a single tree.
+- A collapsing node takes its not yet pruned descendants with it, so collapse alphas never
+  grow going down a path: a row of the pruned tree stops at the first node on its path whose
+  collapse alpha is <= alpha.
+- The selected alpha goes into BACKEND_PARAMS (testing/pruning_search.py): refitting with
+  ccp_alpha builds the same subtree as a plain sklearn model.
+"""
+
+
+class PruningPath:
+
+    # Constructor, runs the weakest-link pruning of the classifier's tree once
+    def __init__(self, classifier):
+        tree = classifier.tree_
+        self.evaluator = TreeEvaluator(classifier)
+        self.classes = classifier.classes_
+        self.node_class = self.evaluator.node_class
+        left = self.evaluator.children_left
+        right = self.evaluator.children_right
+        n_nodes = tree.node_count
+        is_leaf = left == TREE_LEAF
+
+        # Parent, depth and a preorder numbering, so every subtree is a contiguous range
+        parent = np.full(n_nodes, -1, dtype=np.intp)
+        depth = np.zeros(n_nodes, dtype=np.intp)
+        preorder = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            preorder.append(node)
+            if not is_leaf[node]:
+                for child in (right[node], left[node]):
+                    parent[child] = node
+                    depth[child] = depth[node] + 1
+                    stack.append(child)
+        preorder = np.array(preorder, dtype=np.intp)
+        position = np.empty(n_nodes, dtype=np.intp)
+        position[preorder] = np.arange(n_nodes)
+        subtree_end = np.arange(1, n_nodes + 1)
+        for node in preorder[::-1]:
+            if not is_leaf[node]:
+                subtree_end[position[node]] = subtree_end[position[right[node]]]
+
+        # Weighted impurity of each node as a leaf, and of the leaves below it, as sklearn computes it
+        weights = tree.weighted_n_node_samples
+        r_node = tree.impurity * weights / weights[0]
+        r_branch = np.where(is_leaf, r_node, 0.0)
+        n_leaves = is_leaf.astype(np.intp)
+        for node in preorder[::-1]:
+            if node != 0:
+                r_branch[parent[node]] += r_branch[node]
+                n_leaves[parent[node]] += n_leaves[node]
+
+        # Leaves are always leaves; internal nodes collapse at the alpha of their pruning step
+        collapse = np.where(is_leaf, -np.inf, np.inf)
+        active = ~is_leaf
+        alphas = [0.0]
+        impurities = [r_branch[0]]
+        while active.any():
+            candidates = np.flatnonzero(active)
+            effective = (r_node[candidates] - r_branch[candidates]) / (n_leaves[candidates] - 1)
+            weakest = candidates[np.argmin(effective)]
+            alpha = effective.min()
+
+            # The weakest node and everything still growing below it become one leaf
+            members = preorder[position[weakest]:subtree_end[position[weakest]]]
+            members = members[active[members]]
+            collapse[members] = alpha
+            active[members] = False
+
+            delta_r = r_branch[weakest] - r_node[weakest]
+            delta_leaves = n_leaves[weakest] - 1
+            node = weakest
+            while node != -1:
+                r_branch[node] -= delta_r
+                n_leaves[node] -= delta_leaves
+                node = parent[node]
+            alphas.append(alpha)
+            impurities.append(r_branch[0])
+
+        self.collapse = collapse
+        self.depth = depth
+        self.is_leaf = is_leaf
+        self.alphas = np.array(alphas)
+        self.impurities = np.array(impurities)
+        # A node is part of the subtree pruned at alpha while every ancestor's collapse alpha is above it
+        self.removed_at = np.full(n_nodes, np.inf)
+        for node in preorder[1:]:
+            self.removed_at[node] = min(self.removed_at[parent[node]], collapse[parent[node]])
+
+    # Distinct alphas of the path (every one gives a different subtree), smallest first
+    def candidate_alphas(self):
+        return np.unique(self.alphas)
+
+    # Depth, number of leaves and total leaf impurity of the subtree pruned at each alpha
+    def subtree_stats(self, alphas):
+        alphas = np.asarray(alphas, dtype=np.float64).reshape(-1, 1)
+        present = self.removed_at > alphas
+        leaf = present & (self.collapse <= alphas)
+        depth = np.where(present, self.depth, 0).max(axis=1)
+        # Impurity after the last pruning step at or below each alpha
+        impurity = self.impurities[np.searchsorted(self.alphas, alphas[:, 0], side='right') - 1]
+        return depth, leaf.sum(axis=1), impurity
+
+    # Predictions of the subtree pruned at each alpha, one row per alpha
+    def predict(self, X, alphas):
+        paths = self.evaluator.decision_paths(X)
+        collapse = self.collapse[paths]
+        rows = np.arange(len(paths))
+        predictions = np.empty((len(alphas), len(paths)), dtype=self.node_class.dtype)
+        for i, alpha in enumerate(alphas):
+            stop = np.argmax(collapse <= alpha, axis=1)
+            predictions[i] = self.node_class[paths[rows, stop]]
+        return predictions
+
+
+# Parity with sklearn's pruning and refits, run from app/ with: python -m model.PruningPath
+if __name__ == '__main__':
+    import time
+    from sklearn.tree import DecisionTreeClassifier
+    from model.Model import Model
+
+    model = Model()
+    X, y = model.get_training_data()
+    weights = model.get_sample_weight()
+    # Path of the unpruned tree, the production one is already pruned
+    params = {**model.params, "ccp_alpha": 0.0}
+    unpruned = DecisionTreeClassifier(**params).fit(X, y, sample_weight=weights)
+    start = time.perf_counter()
+    path = PruningPath(unpruned)
+    alphas = path.candidate_alphas()
+    depth, leaves, impurity = path.subtree_stats(alphas)
+    predictions = path.predict(X, alphas)
+    curve_ms = (time.perf_counter() - start) * 1000
+
+    expected = unpruned.cost_complexity_pruning_path(X, y, sample_weight=weights)
+    assert np.allclose(path.alphas, expected.ccp_alphas) and np.allclose(path.impurities, expected.impurities)
+    start = time.perf_counter()
+    for i, alpha in enumerate(alphas):
+        pruned = DecisionTreeClassifier(**{**params, "ccp_alpha": alpha}).fit(X, y, sample_weight=weights)
+        assert np.array_equal(pruned.predict(X), predictions[i]), alpha
+        assert pruned.get_depth() == depth[i] and pruned.get_n_leaves() == leaves[i], alpha
+        leaf_impurity = pruned.tree_.impurity * pruned.tree_.weighted_n_node_samples / weights.sum()
+        assert np.isclose(leaf_impurity[pruned.tree_.children_left == TREE_LEAF].sum(), impurity[i]), alpha
+    refit_ms = (time.perf_counter() - start) * 1000
+    print(f"Parity with sklearn on {len(alphas)} pruned subtrees: OK")
+    print(f"Masked curve: {curve_ms:.1f} ms, one refit per alpha: {refit_ms:.1f} ms")
@@ -0,0 +1,137 @@
+import threading
+import time
+from model.features import DIAGNOSIS_LABEL, DIAGNOSIS_MAPPING
+
+"""
+- Incremental retraining from saved patient reports.
+- Reports whose 'Confirmed Diagnosis' is set are added to heart.csv as new training cases.
+- Retrains on a background thread after min_new_records confirmed saves or every interval_seconds,
+  then hot-swaps the classifier in the Model; predictions keep using the old tree until then.
+- The base model is rebuilt from heart.csv on every start, so one retrain runs at start-up
+  when the store already holds confirmed cases.
+- numpy, pandas and sklearn are only imported by the retraining thread, after start-up.
+"""
+
+# Retrain after this many newly confirmed reports
+RETRAIN_AFTER = 20
+
+# Retrain at least this often while there are new confirmed reports (seconds)
+RETRAIN_INTERVAL = 24 * 60 * 60
+
+
+class Retrainer:
+
+    # Constructor, listens to saves on the store and starts the retraining thread
+    def __init__(self, model, store, min_new_records=RETRAIN_AFTER, interval_seconds=RETRAIN_INTERVAL):
+        self.model = model
+        self.store = store
+        self.min_new_records = min_new_records
+        self.interval = interval_seconds
+        self.new_records = 0
+        self.trained_cases = 0
+        self.last_trained = None
+        self.closed = False
+        self.condition = threading.Condition()
+        store.add_save_listener(self.on_save)
+        self.thread = threading.Thread(target=self.run, name="model-retrainer", daemon=True)
+        self.thread.start()
+
+    # Store listener: count confirmed reports, wake the thread once enough have arrived
+    def on_save(self, key, data):
+        if data.get(DIAGNOSIS_LABEL) not in DIAGNOSIS_MAPPING:
+            return
+        with self.condition:
+            self.new_records += 1
+            if self.new_records >= self.min_new_records:
+                self.condition.notify()
+
+    # Retrain right away, e.g. from a menu action
+    def request(self):
+        with self.condition:
+            self.new_records = max(self.new_records, self.min_new_records)
+            self.condition.notify()
+
+    # Stop the retraining thread
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    # Retraining loop: start-up pass, then wait for enough new records or the interval
+    def run(self):
+        # The compiled predictor cannot be refitted; a model that failed to load has nothing to refit
+        try:
+            if not self.model.supports_retraining:
+                return
+        except RuntimeError as e:
+            print(f"Retraining disabled, the model is not available: {e}")
+            return
+        self.retrain_logged()
+        while True:
+            with self.condition:
+                deadline = time.monotonic() + self.interval
+                while not self.closed and self.new_records < self.min_new_records:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if self.closed:
+                    return
+                if not self.new_records:
+                    continue
+                self.new_records = 0
+            self.retrain_logged()
+
+    # Retrain without letting an error stop the thread
+    def retrain_logged(self):
+        try:
+            self.retrain()
+        except Exception as e:
+            print(f"Retraining failed, keeping the current model: {e}")
+
+    # Confirmed cases in the store as (features, targets), skipping reports that do not encode
+    def confirmed_cases(self):
+        import numpy as np
+        reports, targets = [], []
+        for _, data in self.store.iter_reports():
+            target = DIAGNOSIS_MAPPING.get(data.get(DIAGNOSIS_LABEL))
+            if target is None:
+                continue
+            reports.append(data)
+            targets.append(target)
+        if not reports:
+            return None, None
+        try:
+            return self.model.encoder.encode(reports), np.array(targets)
+        except ValueError:
+            # Encode one by one so a single bad report does not block retraining
+            rows, kept = [], []
+            for data, target in zip(reports, targets):
+                try:
+                    rows.append(self.model.encoder.encode(data)[0])
+                    kept.append(target)
+                except ValueError as e:
+                    print(f"Skipping report in retraining: {e}")
+            if not rows:
+                return None, None
+            return np.array(rows), np.array(kept)
+
+    # Train on heart.csv plus the confirmed reports and swap the result in
+    def retrain(self):
+        import pandas as pd
+        X_new, y_new = self.confirmed_cases()
+        if X_new is None:
+            return False
+        X_new = pd.DataFrame(X_new, columns=self.model.encoder.feature_order)
+        X_all, y_all, weights = self.model.extend_training_data(X_new, y_new)
+
+        start = time.perf_counter()
+        classifier = self.model.fit_classifier(X_all, y_all, weights)
+        self.model.swap_classifier(classifier)
+        self.trained_cases = len(X_new)
+        self.last_trained = time.time()
+        print(f"Model retrained with {len(X_new)} confirmed reports "
+              f"({int(weights.sum())} cases, {len(X_all)} unique) "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return True
@@ -0,0 +1,126 @@
+import numpy as np
+
+"""
+- Evaluates a fitted DecisionTreeClassifier directly from its tree_ arrays.
+- Skips sklearn's input validation and pandas, which dominate the cost of a single prediction.
+- Inputs are cast to float32 first, like sklearn does, so results are identical.
+"""
+
+# Marker sklearn uses for a missing child
+TREE_LEAF = -1
+
+class TreeEvaluator:
+
+    # Constructor, copies the flattened tree out of the fitted classifier
+    def __init__(self, classifier):
+        tree = classifier.tree_
+        self.n_features = tree.n_features
+        self.max_depth = tree.max_depth
+        self.feature = tree.feature.astype(np.intp)
+        self.threshold = tree.threshold.copy()
+        self.children_left = tree.children_left.astype(np.intp)
+        self.children_right = tree.children_right.astype(np.intp)
+        # Predicted class of every node, same argmax sklearn uses
+        self.node_class = classifier.classes_.take(np.argmax(tree.value[:, 0, :], axis=1))
+
+        # Plain lists are faster than array indexing for a single row walk
+        self._feature = self.feature.tolist()
+        self._threshold = self.threshold.tolist()
+        self._left = self.children_left.tolist()
+        self._right = self.children_right.tolist()
+
+    # Validate input and convert it to a float32 matrix
+    def _as_matrix(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got input with shape {X.shape}")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity.")
+        return X
+
+    # Index of the leaf reached by one row
+    def leaf_one(self, row):
+        values = row.tolist()
+        feature, threshold, left, right = self._feature, self._threshold, self._left, self._right
+        node = 0
+        while left[node] != TREE_LEAF:
+            if values[feature[node]] <= threshold[node]:
+                node = left[node]
+            else:
+                node = right[node]
+        return node
+
+    # Nodes visited by one row, root to leaf
+    def decision_path(self, row):
+        values = self._as_matrix(row)[0].tolist()
+        feature, threshold, left, right = self._feature, self._threshold, self._left, self._right
+        path = [0]
+        while left[path[-1]] != TREE_LEAF:
+            node = path[-1]
+            path.append(left[node] if values[feature[node]] <= threshold[node] else right[node])
+        return path
+
+    # Nodes visited by every row, one column per depth; rows that stop early repeat their leaf
+    def decision_paths(self, X):
+        X = self._as_matrix(X)
+        rows = np.arange(len(X))
+        paths = np.zeros((len(X), self.max_depth + 1), dtype=np.intp)
+        node = paths[:, 0]
+        for depth in range(1, self.max_depth + 1):
+            left = self.children_left[node]
+            internal = left != TREE_LEAF
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(internal, np.where(go_left, left, self.children_right[node]), node)
+            paths[:, depth] = node
+        return paths
+
+    # Index of the leaf reached by every row, walking all rows one level at a time
+    def apply(self, X):
+        X = self._as_matrix(X)
+        if len(X) == 1:
+            return np.array([self.leaf_one(X[0])], dtype=np.intp)
+
+        rows = np.arange(len(X))
+        node = np.zeros(len(X), dtype=np.intp)
+        for _ in range(self.max_depth):
+            left = self.children_left[node]
+            internal = left != TREE_LEAF
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(internal, np.where(go_left, left, self.children_right[node]), node)
+        return node
+
+    # Predict one row or a matrix of rows
+    def predict(self, X):
+        return self.node_class[self.apply(X)]
+
+
+# Microbenchmark against sklearn, run from app/ with: python -m model.TreeEvaluator
+if __name__ == '__main__':
+    import timeit
+    import pandas as pd
+    from model.Model import Model
+
+    model = Model()
+    evaluator = TreeEvaluator(model.get_classifier())
+    data = pd.read_csv(model.data_path)
+    X = data.iloc[:, :-1]
+
+    # Parity on the whole dataset, as a matrix and row by row
+    expected = model.get_classifier().predict(X)
+    assert np.array_equal(evaluator.predict(X.to_numpy()), expected)
+    assert all(evaluator.predict(row)[0] == label for row, label in zip(X.to_numpy(), expected))
+    print(f"Parity with sklearn on {len(X)} rows: OK")
+
+    row_df = X.iloc[[0]]
+    row = X.to_numpy()[0]
+    runs = 2000
+    sklearn_us = timeit.timeit(lambda: model.get_classifier().predict(row_df), number=runs) / runs * 1e6
+    array_us = timeit.timeit(lambda: evaluator.predict(row), number=runs) / runs * 1e6
+    matrix_us = timeit.timeit(lambda: evaluator.predict(X.to_numpy()), number=200) / 200 * 1e6
+    print(f"sklearn predict, 1-row DataFrame: {sklearn_us:8.1f} us/call")
+    print(f"TreeEvaluator, 1 row:             {array_us:8.1f} us/call ({sklearn_us / array_us:.0f}x faster)")
+    print(f"TreeEvaluator, {len(X)} rows:        {matrix_us:8.1f} us/call")
@@ -0,0 +1,55 @@
+import numpy as np
+
+"""
+- Pluggable classifier backends for the Model: single decision tree, random forest or
+  histogram gradient boosting.
+- Ensembles train on all cores (n_jobs=-1 for the forest, OpenMP threads for boosting).
+- Predictions go through TreeEvaluator / EnsembleEvaluator, which walk the fitted trees
+  with NumPy instead of calling sklearn.
+- Compare the backends with testing/backend_benchmark.py.
+- Importing this module only needs NumPy: sklearn and the evaluators (scipy) are imported when
+  a backend is used, so the --backend choices of the server and predict_batch.py cost nothing
+  with --compiled.
+"""
+
+# Backend name -> default hyperparameters (the tree ones were found with testing/test.py,
+# ccp_alpha with testing/pruning_search.py: depth 3, 4 leaves, CV F1 0.81 against 0.77 unpruned)
+BACKEND_PARAMS = {
+    "tree": {"random_state": 1, "max_depth": 9, "ccp_alpha": 0.029255},
+    "forest": {"n_estimators": 200, "max_depth": 9, "random_state": 1, "n_jobs": -1},
+    "boosting": {"max_iter": 200, "learning_rate": 0.1, "random_state": 1},
+}
+
+
+# Unfitted classifier for a backend
+def make_classifier(backend, params):
+    if backend == "tree":
+        from sklearn.tree import DecisionTreeClassifier
+        return DecisionTreeClassifier(**params)
+    if backend == "forest":
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(**params)
+    if backend == "boosting":
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        return HistGradientBoostingClassifier(**params)
+    raise ValueError(f"Unknown model backend '{backend}', expected one of {', '.join(BACKEND_PARAMS)}.")
+
+
+# Fit a classifier for a backend; ensembles are fitted on a plain matrix (the evaluators never see pandas)
+# sample_weight holds the duplicate counts of compacted rows (see model/compaction.py)
+def fit_classifier(backend, params, X, y, sample_weight=None):
+    classifier = make_classifier(backend, params)
+    if backend == "tree":
+        classifier.fit(X, y, sample_weight=sample_weight)
+    else:
+        classifier.fit(np.asarray(X, dtype=np.float64), np.asarray(y), sample_weight=sample_weight)
+    return classifier
+
+
+# Fast predictor for a fitted classifier
+def make_evaluator(classifier):
+    if hasattr(classifier, "tree_"):
+        from model.TreeEvaluator import TreeEvaluator
+        return TreeEvaluator(classifier)
+    from model.EnsembleEvaluator import EnsembleEvaluator
+    return EnsembleEvaluator(classifier)
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+"""
+- Collapses duplicate rows of a training set into one row with a sample weight.
+- heart.csv has 1025 rows but only 302 unique ones: fitting on the unique rows with their
+  counts as sample_weight builds the same tree in a third of the rows.
+- Splits and cross-validation folds are taken over the unique rows, so an exact duplicate of a
+  test row can no longer sit in the training set.
+- Rows are compared on every column (features and target); the first occurrence order is kept.
+"""
+
+
+# Unique rows of data and their summed weights (each row counts as 1 unless weights are given)
+def compact_dataset(data, weights=None):
+    values = np.ascontiguousarray(data.to_numpy(dtype=np.float64))
+    # One opaque bytes value per row makes np.unique compare whole rows in a single sort
+    rows = values.view(np.dtype((np.void, values.dtype.itemsize * values.shape[1]))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    if weights is None:
+        group_weights = np.bincount(inverse.ravel()).astype(np.float64)
+    else:
+        group_weights = np.bincount(inverse.ravel(), weights=np.asarray(weights, dtype=np.float64))
+
+    order = np.argsort(first)
+    compacted = data.iloc[first[order]].reset_index(drop=True)
+    return compacted, group_weights[order]
+
+
+# Same as compact_dataset for separate features and target
+def compact_xy(X, y, weights=None):
+    data = pd.concat([X.reset_index(drop=True), y.reset_index(drop=True)], axis=1)
+    compacted, group_weights = compact_dataset(data, weights)
+    return compacted.iloc[:, :-1], compacted.iloc[:, -1], group_weights
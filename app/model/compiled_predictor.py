@@ -0,0 +1,180 @@
+# Generated by export_predictor.py, do not edit: re-run it after retraining or changing the params.
+import numpy as np
+
+"""
+- Decision tree exported from the trained Model, scored with NumPy only (no sklearn or pandas).
+- Artifact 31ae3c8cf118d965, params {'random_state': 1, 'max_depth': 9, 'ccp_alpha': 0.029255}: 7 nodes, depth 3.
+- encode() takes the same form values as FeatureEncoder, predict() gives the same results as
+  DecisionTreeClassifier.predict (inputs are cast to float32 like sklearn does).
+"""
+
+ARTIFACT_KEY = '31ae3c8cf118d965289ed276952fbaddec00e0502cef54d94da07132b16c553f'
+
+PARAMS = {'random_state': 1, 'max_depth': 9, 'ccp_alpha': 0.029255}
+
+FEATURE_ORDER = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang', 'oldpeak', 'slope',
+ 'ca', 'thal']
+
+LABEL_TO_FEATURE = {'Age': 'age',
+ 'Sex': 'sex',
+ 'Chest Pain Type (0-3)': 'cp',
+ 'Resting Blood Pressure (mmHg)': 'trestbps',
+ 'Serum Cholesterol (mg/dL)': 'chol',
+ 'Fasting Blood Sugar > 120 mg/dL': 'fbs',
+ 'Resting ECG': 'restecg',
+ 'Max Heart Rate (BPM)': 'thalach',
+ 'Exercise Induced Angina': 'exang',
+ 'ST Depression': 'oldpeak',
+ 'Slope of Peak Exercise ST Segment': 'slope',
+ 'Number of Major Vessels': 'ca',
+ 'Thalassemia': 'thal'}
+
+VALUE_MAPPING = {'Sex': {'Male': 1, 'Female': 0},
+ 'Fasting Blood Sugar > 120 mg/dL': {'Yes': 1, 'No': 0},
+ 'Exercise Induced Angina': {'Yes': 1, 'No': 0},
+ 'Chest Pain Type (0-3)': {'0': 0, '1': 1, '2': 2, '3': 3},
+ 'Resting ECG': {'Normal': 0, 'ST-T Wave Abnormality': 1, 'Left Ventricular Hypertrophy': 2},
+ 'Slope of Peak Exercise ST Segment': {'Upsloping': 0, 'Flat': 1, 'Downsloping': 2},
+ 'Number of Major Vessels': {'0': 0, '1': 1, '2': 2, '3': 3},
+ 'Thalassemia': {'Normal': 3, 'Fixed Defect': 6, 'Reversible Defect': 7}}
+
+CLASSES = np.array([0, 1])
+
+MAX_DEPTH = 3
+
+FEATURE = np.array([2, 11, 12, -2, -2, -2, -2], dtype=np.intp)
+
+THRESHOLD = np.array([0.5, 0.5, 2.5, -2.0, -2.0, -2.0, -2.0], dtype=np.float64)
+
+CHILDREN_LEFT = np.array([1, 2, 3, -1, -1, -1, -1], dtype=np.intp)
+
+CHILDREN_RIGHT = np.array([6, 5, 4, -1, -1, -1, -1], dtype=np.intp)
+
+# Index into CLASSES of the class predicted at every node
+NODE_CLASS = np.array([1, 0, 0, 1, 0, 0, 1], dtype=np.intp)
+
+# Marker sklearn uses for a missing child
+TREE_LEAF = -1
+
+
+class EncodingError(ValueError):
+
+    # Constructor, row is 1-based within the encoded batch
+    def __init__(self, label, row, message):
+        super().__init__(f"{message} (row {row})" if row is not None else message)
+        self.message = message
+        self.label = label
+        self.row = row
+
+
+# Per feature (label, feature, mapping); digit labels also match numbers, as in FeatureEncoder
+_FEATURE_TO_LABEL = {feature: label for label, feature in LABEL_TO_FEATURE.items()}
+_COLUMNS = []
+for _feature in FEATURE_ORDER:
+    _label = _FEATURE_TO_LABEL[_feature]
+    _mapping = VALUE_MAPPING.get(_label)
+    if _mapping is not None:
+        _mapping = dict(_mapping)
+        for _key, _value in list(_mapping.items()):
+            if _key.isdigit():
+                _mapping.setdefault(int(_key), _value)
+    _COLUMNS.append((_label, _feature, _mapping))
+
+# Plain lists are faster than array indexing for a single row walk
+_FEATURE = FEATURE.tolist()
+_THRESHOLD = THRESHOLD.tolist()
+_LEFT = CHILDREN_LEFT.tolist()
+_RIGHT = CHILDREN_RIGHT.tolist()
+
+
+# Values of one column; a record without it is an error
+def _column(records, name):
+    try:
+        return [record[name] for record in records]
+    except KeyError:
+        row = next(i for i, record in enumerate(records, 1) if name not in record)
+        raise EncodingError(name, row, f"Missing value for {name}")
+
+
+# Encode one dict of form values (labels, or dataset feature names) or a list of them into an (n, 13) matrix
+# Column sources are chosen from the first record, as in FeatureEncoder
+def encode(data):
+    records = [data] if isinstance(data, dict) else list(data)
+    out = np.empty((len(records), len(_COLUMNS)), dtype=np.float64)
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise EncodingError(None, i + 1, "Each patient must be a dict of form values")
+    if not records:
+        return out
+
+    first = records[0]
+    for j, (label, feature, mapping) in enumerate(_COLUMNS):
+        if label in first and mapping is not None:
+            values = _column(records, label)
+            codes = [mapping.get(value) for value in values]
+            if None in codes:
+                # Tolerate whitespace and non-string values
+                for i, code in enumerate(codes):
+                    if code is None:
+                        code = mapping.get(str(values[i]).strip())
+                        if code is None:
+                            raise EncodingError(label, i + 1, f"Invalid value for {label}: {values[i]!r}")
+                        codes[i] = code
+            out[:, j] = codes
+            continue
+
+        name = label if label in first else feature
+        if name not in first:
+            raise EncodingError(label, None, f"Missing value for {label}")
+        values = _column(records, name)
+        try:
+            out[:, j] = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            out[:, j] = np.nan
+        if np.isnan(out[:, j]).any():
+            for i, value in enumerate(values):
+                try:
+                    if np.isnan(float(value)):
+                        raise ValueError
+                except (TypeError, ValueError):
+                    raise EncodingError(name, i + 1, f"Invalid input for {name}: must be a number, got {value!r}")
+    return out
+
+
+# Validate input and convert it to a float32 matrix
+def _as_matrix(X):
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    if X.ndim != 2 or X.shape[1] != len(FEATURE_ORDER):
+        raise ValueError(f"Expected {len(FEATURE_ORDER)} features, got input with shape {X.shape}")
+    if not np.isfinite(X).all():
+        raise ValueError("Input contains NaN or infinity.")
+    return X
+
+
+# Index of the leaf reached by every row
+def apply(X):
+    X = _as_matrix(X)
+    if len(X) == 1:
+        values = X[0].tolist()
+        node = 0
+        while _LEFT[node] != TREE_LEAF:
+            node = _LEFT[node] if values[_FEATURE[node]] <= _THRESHOLD[node] else _RIGHT[node]
+        return np.array([node], dtype=np.intp)
+
+    rows = np.arange(len(X))
+    node = np.zeros(len(X), dtype=np.intp)
+    for _ in range(MAX_DEPTH):
+        left = CHILDREN_LEFT[node]
+        internal = left != TREE_LEAF
+        if not internal.any():
+            break
+        go_left = X[rows, FEATURE[node]] <= THRESHOLD[node]
+        node = np.where(internal, np.where(go_left, left, CHILDREN_RIGHT[node]), node)
+    return node
+
+
+# Predict one row or a matrix of rows
+def predict(X):
+    return CLASSES[NODE_CLASS[apply(X)]]
@@ -0,0 +1,46 @@
+"""
+- Shared mapping between the GUI form labels and the model features.
+- Compiled into lookup tables by FeatureEncoder, which the form and the batch tools share.
+"""
+
+# Map user input to model value (labels not listed are plain numbers)
+VALUE_MAPPING = {
+    "Sex": {"Male": 1, "Female": 0},
+    "Fasting Blood Sugar > 120 mg/dL": {"Yes": 1, "No": 0},
+    "Exercise Induced Angina": {"Yes": 1, "No": 0},
+    "Chest Pain Type (0-3)": {"0": 0, "1": 1, "2": 2, "3": 3},
+    "Resting ECG": {"Normal": 0, "ST-T Wave Abnormality": 1, "Left Ventricular Hypertrophy": 2},
+    "Slope of Peak Exercise ST Segment": {"Upsloping": 0, "Flat": 1, "Downsloping": 2},
+    "Number of Major Vessels": {"0": 0, "1": 1, "2": 2, "3": 3},
+    "Thalassemia": {"Normal": 3, "Fixed Defect": 6, "Reversible Defect": 7},
+}
+
+# Map of GUI labels to feature names
+LABEL_TO_FEATURE = {
+    "Age": "age",
+    "Sex": "sex",
+    "Chest Pain Type (0-3)": "cp",
+    "Resting Blood Pressure (mmHg)": "trestbps",
+    "Serum Cholesterol (mg/dL)": "chol",
+    "Fasting Blood Sugar > 120 mg/dL": "fbs",
+    "Resting ECG": "restecg",
+    "Max Heart Rate (BPM)": "thalach",
+    "Exercise Induced Angina": "exang",
+    "ST Depression": "oldpeak",
+    "Slope of Peak Exercise ST Segment": "slope",
+    "Number of Major Vessels": "ca",
+    "Thalassemia": "thal"
+}
+
+# Ordered list of feature names
+FEATURE_ORDER = [
+    "age", "sex", "cp", "trestbps", "chol",
+    "fbs", "restecg", "thalach", "exang",
+    "oldpeak", "slope", "ca", "thal"
+]
+
+# Report field holding the diagnosis confirmed after the visit, used for retraining
+DIAGNOSIS_LABEL = "Confirmed Diagnosis"
+
+# Confirmed diagnosis -> target ("Unconfirmed" reports are not used for training)
+DIAGNOSIS_MAPPING = {"No Heart Disease": 0, "Heart Disease": 1}
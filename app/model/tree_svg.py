@@ -0,0 +1,197 @@
+import hashlib
+import os
+import threading
+from xml.sax.saxutils import escape
+import numpy as np
+
+"""
+- Renders the live decision tree to SVG straight from the classifier's tree_ arrays,
+  replacing the static images/tree.svg made with matplotlib's plot_tree in testing/test.py.
+- The SVG is cached in memory and in the model cache, keyed by a hash of the tree, so a
+  retrained or swapped model is re-rendered on its next use.
+- A patient's decision path is highlighted by adding a style block to the cached SVG.
+"""
+
+# Class display names, same as testing/test.py make_img
+CLASS_LABELS = ["Not probable", "Highly probable"]
+
+# Node fill per class, mixed with white by purity like plot_tree(filled=True)
+CLASS_COLORS = [(229, 129, 57), (57, 157, 229)]
+
+# Layout in pixels
+NODE_WIDTH = 132
+NODE_HEIGHT = 58
+X_STEP = 142
+Y_STEP = 100
+MARGIN = 20
+
+HIGHLIGHT_COLOR = "#d62728"
+
+# Marker replaced by the highlight style
+STYLE_MARKER = "<!--highlight-->"
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+# Hash of the fitted tree and the names shown in it
+def tree_hash(classifier, feature_names):
+    tree = classifier.tree_
+    digest = hashlib.sha256()
+    for array in (tree.feature, tree.threshold, tree.children_left, tree.children_right,
+                  tree.value, tree.weighted_n_node_samples, np.asarray(classifier.classes_)):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update("\0".join(map(str, feature_names)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+# Fill color of a node from its class distribution
+def node_color(distribution):
+    order = np.argsort(distribution)[::-1]
+    top, second = distribution[order[0]], distribution[order[1]] if len(order) > 1 else 0.0
+    alpha = 0.0 if top == second else (top - second) / (1 - second)
+    r, g, b = CLASS_COLORS[order[0] % len(CLASS_COLORS)]
+    return "#%02x%02x%02x" % tuple(int(round(alpha * c + (1 - alpha) * 255)) for c in (r, g, b))
+
+
+# x (in leaf slots) and depth of every node: leaves left to right, parents centred over children
+def layout(tree):
+    left, right = tree.children_left, tree.children_right
+    x = np.zeros(tree.node_count)
+    depth = np.zeros(tree.node_count, dtype=int)
+    next_leaf = 0
+    # Iterative post-order walk, the tree can be deeper than the recursion limit allows
+    stack = [(0, False)]
+    while stack:
+        node, visited = stack.pop()
+        if left[node] == -1:
+            x[node] = next_leaf
+            next_leaf += 1
+        elif visited:
+            x[node] = (x[left[node]] + x[right[node]]) / 2
+        else:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+            stack.append((node, True))
+            stack.append((right[node], False))
+            stack.append((left[node], False))
+    return x, depth, next_leaf
+
+
+# SVG document of the tree, nodes are <g id="n{node}"> and edges <line id="e{child}">
+def render_svg(classifier, feature_names, class_labels=CLASS_LABELS):
+    tree = classifier.tree_
+    x, depth, n_leaves = layout(tree)
+    width = n_leaves * X_STEP + 2 * MARGIN
+    height = (int(depth.max()) + 1) * Y_STEP + 2 * MARGIN
+    classes = list(classifier.classes_)
+
+    def center(node):
+        return MARGIN + x[node] * X_STEP + X_STEP / 2, MARGIN + depth[node] * Y_STEP
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="Helvetica, Arial, sans-serif" font-size="11">',
+        '<style>rect{stroke:#444;stroke-width:1}line{stroke:#888;stroke-width:1.2}'
+        'text{text-anchor:middle}</style>',
+        STYLE_MARKER,
+        f'<rect x="0" y="0" width="{width}" height="{height}" fill="white" stroke="none"/>',
+    ]
+    # Edges first so the boxes are drawn over them
+    for node in range(tree.node_count):
+        if tree.children_left[node] == -1:
+            continue
+        px, py = center(node)
+        for child, label in ((tree.children_left[node], "True"), (tree.children_right[node], "False")):
+            cx, cy = center(child)
+            parts.append(f'<line id="e{child}" x1="{px:.1f}" y1="{py + NODE_HEIGHT:.1f}" x2="{cx:.1f}" y2="{cy:.1f}"/>')
+            if node == 0:
+                parts.append(f'<text x="{(px + cx) / 2:.1f}" y="{(py + NODE_HEIGHT + cy) / 2:.1f}">{label}</text>')
+
+    for node in range(tree.node_count):
+        cx, cy = center(node)
+        distribution = tree.value[node, 0]
+        class_index = int(np.argmax(distribution))
+        class_value = classes[class_index]
+        class_name = class_labels[class_index] if class_index < len(class_labels) else str(class_value)
+        lines = []
+        if tree.children_left[node] != -1:
+            lines.append(f"{escape(str(feature_names[tree.feature[node]]))} &lt;= {tree.threshold[node]:.2f}")
+        # Weighted count, so rows compacted into sample weights still count once per heart.csv row
+        lines.append(f"samples = {tree.weighted_n_node_samples[node]:g}")
+        lines.append(f"class = {escape(class_name)}")
+        parts.append(f'<g id="n{node}"><title>node {node}</title>'
+                     f'<rect x="{cx - NODE_WIDTH / 2:.1f}" y="{cy:.1f}" width="{NODE_WIDTH}" '
+                     f'height="{NODE_HEIGHT}" rx="6" fill="{node_color(distribution)}"/>')
+        first_y = cy + NODE_HEIGHT / 2 - (len(lines) - 1) * 7 + 4
+        for i, line in enumerate(lines):
+            parts.append(f'<text x="{cx:.1f}" y="{first_y + i * 14:.1f}">{line}</text>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    return "\n".join(parts)
+
+
+# Copy of the SVG with the given nodes (a decision path) highlighted
+def highlight(svg, path_nodes):
+    path_nodes = [int(node) for node in path_nodes]
+    if not path_nodes:
+        return svg
+    rules = [f"#n{node} rect{{stroke:{HIGHLIGHT_COLOR};stroke-width:4}}" for node in path_nodes]
+    rules += [f"#e{node}{{stroke:{HIGHLIGHT_COLOR};stroke-width:4}}" for node in path_nodes[1:]]
+    return svg.replace(STYLE_MARKER, f"<style>{''.join(rules)}</style>", 1)
+
+
+# SVG of the classifier, from memory, the cache directory or freshly rendered
+def cached_svg(classifier, feature_names, cache_dir=None):
+    key = tree_hash(classifier, feature_names)
+    with _cache_lock:
+        svg = _cache.get(key)
+    if svg is not None:
+        return key, svg
+
+    path = os.path.join(cache_dir, f"tree-{key[:16]}.svg") if cache_dir else None
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            svg = f.read()
+    else:
+        svg = render_svg(classifier, feature_names)
+        if path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding='utf-8') as f:
+                    f.write(svg)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Could not cache tree SVG '{path}': {e}")
+    with _cache_lock:
+        _cache[key] = svg
+    return key, svg
+
+
+# Render time against matplotlib's plot_tree, run from app/ with: python -m model.tree_svg
+if __name__ == '__main__':
+    import io
+    import time
+    from model.Model import Model
+
+    model = Model()
+    classifier = model.get_classifier()
+    start = time.perf_counter()
+    svg = render_svg(classifier, model.get_feature_names())
+    render_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    highlight(svg, [0, classifier.tree_.children_left[0]])
+    highlight_ms = (time.perf_counter() - start) * 1000
+    print(f"render_svg: {render_ms:8.1f} ms ({len(svg) // 1024} KB), highlight: {highlight_ms:.2f} ms")
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from sklearn.tree import plot_tree
+    start = time.perf_counter()
+    plt.figure(figsize=(20, 20))
+    plot_tree(classifier, filled=True, feature_names=model.get_feature_names(), class_names=CLASS_LABELS,
+              impurity=False, proportion=False, rounded=True, precision=2)
+    plt.savefig(io.BytesIO(), format='svg')
+    plt.close()
+    print(f"plot_tree:  {(time.perf_counter() - start) * 1000:8.1f} ms")
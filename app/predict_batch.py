@@ -0,0 +1,31 @@
+# predict_batch.py
+import argparse
+import time
+from model.backends import BACKEND_PARAMS
+
+"""
+- Scores a CSV file of patients without the GUI.
+- Columns can be the form labels (e.g. 'Sex' with 'Male'/'Female') or the dataset feature names.
+- The file is read and written in chunks so memory use does not depend on its size.
+- --compiled scores with the tree exported by export_predictor.py, without sklearn or pandas.
+"""
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Score a CSV file of patients.")
+    parser.add_argument("input", help="CSV file with one patient per row")
+    parser.add_argument("output", help="CSV file to write, input columns plus 'Prediction'")
+    parser.add_argument("--chunksize", type=int, default=10000, help="rows read per chunk")
+    parser.add_argument("--backend", choices=list(BACKEND_PARAMS), default="tree", help="model backend")
+    parser.add_argument("--compiled", action="store_true", help="use the exported tree (export_predictor.py)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.compiled:
+        from model.CompiledModel import CompiledModel
+        model = CompiledModel()
+    else:
+        from model.Model import Model
+        model = Model(backend=args.backend)
+    rows = model.predict_batch(args.input, args.output, chunksize=args.chunksize)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} patients in {elapsed:.2f}s, predictions saved to '{args.output}'.")
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import threading
+import time
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+
+"""
+- The report encryption keys: 'secret.key' holds one Fernet key per line, newest first (a file
+  from generate_key.py is a key ring of one).
+- Encrypts with the newest key and decrypts with any of them (MultiFernet), so reports stay
+  readable while rotate_key.py re-encrypts the store with a new key.
+- Picks up a key added to the file while the app runs: the file is checked at most once a
+  second before encrypting, and again when a token does not decrypt.
+"""
+
+# Seconds between checks of the key file before encrypting
+KEY_CHECK_SECONDS = 1.0
+
+
+class KeyRing:
+
+    # Constructor, loads the key file
+    def __init__(self, path, check_interval=KEY_CHECK_SECONDS):
+        self.path = path
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.load()
+
+    # Keys of a key file's contents, newest first
+    @staticmethod
+    def parse(data):
+        keys = [line.strip() for line in data.splitlines() if line.strip()]
+        if not keys:
+            raise ValueError("The key file holds no keys.")
+        return keys
+
+    # MultiFernet for a key file's contents (e.g. in worker processes)
+    @staticmethod
+    def cipher_for(data):
+        return MultiFernet([Fernet(key) for key in KeyRing.parse(data)])
+
+    # Short fingerprint of a key, safe to write next to the data
+    @staticmethod
+    def fingerprint(key):
+        return hashlib.sha256(key).hexdigest()[:16]
+
+    # Replace the key file atomically with the given keys
+    @staticmethod
+    def write(path, keys):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(key + b"\n" for key in keys))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    # Put a new key in front of the key file, returns it
+    @staticmethod
+    def add_key(path):
+        with open(path, "rb") as f:
+            keys = KeyRing.parse(f.read())
+        key = Fernet.generate_key()
+        KeyRing.write(path, [key] + keys)
+        return key
+
+    # Drop every key but the newest, once nothing is encrypted with the others
+    @staticmethod
+    def retire_old_keys(path):
+        with open(path, "rb") as f:
+            keys = KeyRing.parse(f.read())
+        KeyRing.write(path, keys[:1])
+        return len(keys) - 1
+
+    # Read the key file
+    def load(self):
+        with self.lock:
+            stat = os.stat(self.path)
+            with open(self.path, "rb") as f:
+                data = f.read()
+            self.keys = self.parse(data)
+            self.data = data
+            self.cipher = MultiFernet([Fernet(key) for key in self.keys])
+            self.version = (stat.st_mtime_ns, stat.st_size)
+            self.checked = time.monotonic()
+
+    # Reload the key file if it changed; unless forced, at most once per check interval
+    def reload(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.checked < self.check_interval:
+            return False
+        self.checked = now
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if (stat.st_mtime_ns, stat.st_size) == self.version:
+            return False
+        self.load()
+        return True
+
+    # Encrypt with the newest key
+    def encrypt(self, data):
+        self.reload()
+        return self.cipher.encrypt(data)
+
+    # Decrypt with any key, reloading the key file once for a token of a newer key
+    def decrypt(self, token):
+        try:
+            return self.cipher.decrypt(token)
+        except InvalidToken:
+            if not self.reload(force=True):
+                raise
+            return self.cipher.decrypt(token)
+
+    # Re-encrypt a token with the newest key, same length and timestamp
+    def rotate(self, token):
+        return self.cipher.rotate(token)
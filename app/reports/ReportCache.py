@@ -0,0 +1,69 @@
+import os
+import threading
+from collections import OrderedDict
+
+"""
+- Bounded LRU cache of decrypted reports in front of a ReportStore.
+- Saves made in this process evict only the saved patient (write notification).
+- Any other change to the data file (size, mtime or inode) clears the whole cache.
+"""
+
+
+class ReportCache:
+
+    # Constructor
+    def __init__(self, store, max_entries=256):
+        self.store = store
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.signature = self.file_signature()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        store.add_save_listener(self.on_save)
+
+    # Identify the current version of the data file
+    def file_signature(self):
+        try:
+            st = os.stat(self.store.data_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    # Get a report, decrypting it only on a miss
+    def get(self, key):
+        with self.lock:
+            signature = self.file_signature()
+            if signature != self.signature:
+                self.entries.clear()
+                self.signature = signature
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        data = self.store.get(key)
+        if data is not None:
+            with self.lock:
+                # Don't cache a report that was replaced while it was being read
+                if self.signature != signature or self.file_signature() != signature:
+                    return data
+                self.entries[key] = data
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return data
+
+    # Save notification from a store in this process
+    def on_save(self, key, data):
+        self.invalidate(key)
+
+    # Drop one patient, or everything when key is None
+    def invalidate(self, key=None):
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+            # The file change is accounted for, keep the other entries
+            self.signature = self.file_signature()
@@ -0,0 +1,245 @@
+import os
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+"""
+- Write-ahead journal in front of a ReportStore, '<base>.wal'.
+- A save is acknowledged once its record ('crc32 token', the Fernet token of the report) is
+  fsynced to the journal. Concurrent saves are group committed: the first waiting saver writes
+  every queued record with one write and one fsync, appends them to the store's data and index
+  files and wakes the others.
+- The data and index files are not fsynced per save. A background compactor folds the journal
+  into them once it is large or old: both files are fsynced and an empty journal replaces the
+  old one (a checkpoint).
+- The journal header records the data and index file sizes at the last checkpoint. A journal
+  that still has records on open means the last run did not checkpoint: both files are cut back
+  to the checkpoint and every record with a valid CRC is replayed. A torn last record was never
+  acknowledged and is dropped.
+- One process writes a store at a time ('<base>.lock'); other processes open it read only.
+"""
+
+JOURNAL_MAGIC = b"HDWAL1"
+
+# Checkpoint once the journal is this large (bytes)
+COMPACT_BYTES = 4 * 1024 * 1024
+
+# Checkpoint a non-empty journal at least this often (seconds)
+COMPACT_SECONDS = 30
+
+
+# Saves waiting for the same fsync
+class _Group:
+
+    # Constructor
+    def __init__(self):
+        self.records = []
+        self.done = False
+        self.error = None
+
+
+# fsync a file by path (opened for append, Windows cannot fsync a read-only handle)
+def _fsync_path(path):
+    if os.path.exists(path):
+        with open(path, "ab") as f:
+            os.fsync(f.fileno())
+
+
+# fsync a directory so a rename in it is durable (not possible on Windows)
+def _fsync_dir(path):
+    if os.name != 'posix':
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class ReportJournal:
+
+    # Constructor, replays the records left by a crash (see recover) and starts the compactor
+    def __init__(self, store, lock_file, pending=(), compact_bytes=COMPACT_BYTES, compact_seconds=COMPACT_SECONDS):
+        self.store = store
+        self.path = store.journal_path
+        self.lock_file = lock_file
+        self.compact_bytes = compact_bytes
+        self.compact_seconds = compact_seconds
+        self.condition = threading.Condition()
+        self.group = _Group()
+        self.busy = False
+        self.closed = False
+        self.file = None
+        self.size = 0
+        self.header_size = 0
+        self.first_record_time = None
+        self.commits = 0
+        self.records = 0
+        self.checkpoints = 0
+        self.wake = threading.Event()
+
+        if pending:
+            self.store.apply([(self.store.record_key(token), token) for token in pending])
+        self.checkpoint()
+        self.thread = threading.Thread(target=self.run, name="report-compactor", daemon=True)
+        self.thread.start()
+
+    # Lock file held while a process writes the store, None if another process has it
+    @staticmethod
+    def acquire_lock(lock_path):
+        lock_file = open(lock_path, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    # Tokens to replay from an unfinished journal; cuts the data and index files back to its checkpoint
+    @staticmethod
+    def recover(journal_path, data_path, index_path):
+        if not os.path.exists(journal_path):
+            return []
+        with open(journal_path, "rb") as f:
+            header = f.readline()
+            magic, *sizes = header.split()
+            if magic != JOURNAL_MAGIC or len(sizes) != 2:
+                raise ValueError(f"'{journal_path}' is not a report journal.")
+            data_size, index_size = (int(size) for size in sizes)
+            tokens = []
+            for line in f:
+                crc, _, token = line.rstrip(b"\n").partition(b" ")
+                try:
+                    valid = line.endswith(b"\n") and len(crc) == 8 and int(crc, 16) == zlib.crc32(token)
+                except ValueError:
+                    valid = False
+                # Stop at a torn or damaged record, it was never acknowledged
+                if not valid:
+                    break
+                tokens.append(token)
+        if tokens:
+            for path, size in ((data_path, data_size), (index_path, index_size)):
+                if os.path.exists(path) and os.path.getsize(path) > size:
+                    with open(path, "rb+") as f:
+                        f.truncate(size)
+        return tokens
+
+    # Durably append records [(key, token)] to the journal, then to the store
+    def commit(self, records):
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("The report journal is closed.")
+            group = self.group
+            group.records.extend(records)
+            while not group.done:
+                if self.busy:
+                    self.condition.wait()
+                    continue
+                # Leader: flush the open group, later savers queue up in a new one
+                self.busy = True
+                self.group = _Group()
+                self.condition.release()
+                try:
+                    self.write_group(group)
+                except Exception as e:
+                    group.error = e
+                finally:
+                    self.condition.acquire()
+                    self.busy = False
+                    group.done = True
+                    self.condition.notify_all()
+            if group.error is not None:
+                raise group.error
+
+    # One write and one fsync for the whole group, then apply it to the store
+    def write_group(self, group):
+        lines = b"".join(b"%08x %s\n" % (zlib.crc32(token), token) for _, token in group.records)
+        self.file.write(lines)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.size += len(lines)
+        if self.first_record_time is None:
+            self.first_record_time = time.monotonic()
+        self.commits += 1
+        self.records += len(group.records)
+        self.store.apply(group.records)
+        if self.size >= self.compact_bytes:
+            self.wake.set()
+
+    # fsync the data and index files, then start an empty journal holding their sizes
+    def checkpoint(self):
+        _fsync_path(self.store.data_path)
+        _fsync_path(self.store.index_path)
+        data_size, index_size = (os.path.getsize(path) if os.path.exists(path) else 0
+                                 for path in (self.store.data_path, self.store.index_path))
+        header = JOURNAL_MAGIC + b" %d %d\n" % (data_size, index_size)
+
+        if self.file is not None:
+            self.file.close()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        _fsync_dir(self.path)
+        self.file = open(self.path, "ab")
+        self.size = self.header_size = len(header)
+        self.first_record_time = None
+        self.checkpoints += 1
+
+    # Checkpoint between groups, once there is something to fold in
+    def compact(self):
+        with self.condition:
+            while self.busy:
+                self.condition.wait()
+            if self.size == self.header_size or self.file is None:
+                return False
+            self.busy = True
+        try:
+            self.checkpoint()
+        finally:
+            with self.condition:
+                self.busy = False
+                self.condition.notify_all()
+        return True
+
+    # Compactor loop: fold the journal in when it is large, or has been waiting long enough
+    def run(self):
+        while not self.closed:
+            self.wake.wait(self.compact_seconds / 4)
+            self.wake.clear()
+            if self.closed:
+                return
+            waited = self.first_record_time is not None and \
+                time.monotonic() - self.first_record_time >= self.compact_seconds
+            if self.size >= self.compact_bytes or waited:
+                try:
+                    self.compact()
+                except OSError as e:
+                    print(f"Report journal checkpoint failed, retrying later: {e}")
+
+    # Stop the compactor and leave a checkpointed, empty journal
+    def close(self):
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            # Savers already queued still get their group written
+            while self.busy or self.group.records:
+                self.condition.wait()
+        self.compact()
+        self.wake.set()
+        self.thread.join()
+        self.file.close()
+        self.lock_file.close()
@@ -0,0 +1,298 @@
+import atexit
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+from cryptography.fernet import InvalidToken
+from instrumentation import span, timed
+from reports.ReportJournal import ReportJournal
+
+"""
+- Append-only encrypted patient report store replacing the monolithic 'hdisrep.json' blob.
+- '<base>.dat' holds one Fernet token per line, each encrypting a single report.
+- '<base>.idx' maps a keyed hash of 'first_last_dob' to the (offset, length) of the latest record.
+- Patient names never appear in plain text: the index hashes keys with a secret that is stored
+  encrypted in the index header.
+- Saves go through a write-ahead journal ('<base>.wal', see ReportJournal): a save returns once
+  its record is fsynced, concurrent saves share one fsync, and a crash never leaves a torn record
+  in the store. Stores opened on the same files in one process share the journal.
+- Tools that only read (export_reports.py) open with read_only=True and leave the writer lock
+  to the app.
+- The legacy blob is imported when a new store is created; '<base>.migrating' marks an import
+  that has not finished, which the next open retries.
+- Records are re-encrypted in place (same length) by rotate_key.py; a record that fails to
+  decrypt is read once more in case it was being rewritten.
+"""
+
+INDEX_MAGIC = b"HDIX1"
+
+# Save listeners per data file, shared by every store opened on it in this process
+_save_listeners = {}
+
+# Journal per data file, shared by every store opened on it in this process
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+class ReportStore:
+
+    # Constructor, opens the store and migrates the legacy blob the first time; read_only never takes the writer lock
+    def __init__(self, base_path, cipher_suite, legacy_path=None, read_only=False):
+        self.data_path = f"{base_path}.dat"
+        self.index_path = f"{base_path}.idx"
+        self.journal_path = f"{base_path}.wal"
+        self.cipher_suite = cipher_suite
+        self.index = {}
+        self.index_offset = 0
+        self.index_secret = None
+        self.lock = threading.RLock()
+
+        with _journals_lock:
+            self.journal = None if read_only else _journals.get(os.path.abspath(self.data_path))
+            lock_file, pending = None, []
+            if self.journal is None and not read_only:
+                # Only the process holding the lock recovers and writes, others only read
+                lock_file = ReportJournal.acquire_lock(f"{base_path}.lock")
+                if lock_file is not None:
+                    pending = ReportJournal.recover(self.journal_path, self.data_path, self.index_path)
+
+            # Marked until the legacy blob is imported, so a failed migration is retried on the next open
+            migration_marker = f"{base_path}.migrating"
+            new_store = not os.path.exists(self.index_path) and not os.path.exists(self.data_path)
+            migrate = lock_file is not None and legacy_path is not None and os.path.exists(legacy_path) and \
+                (new_store or os.path.exists(migration_marker))
+            if migrate and new_store:
+                with open(migration_marker, "wb"):
+                    pass
+            # Only the lock holder repairs or creates the files, a reader must not cut a record being appended
+            if os.path.exists(self.index_path):
+                self.load_index(repair=lock_file is not None)
+            elif lock_file is None:
+                raise FileNotFoundError(f"'{self.index_path}' does not exist yet; the store is open read only.")
+            elif os.path.exists(self.data_path):
+                self.rebuild_index()
+            else:
+                self.create_index()
+
+            if lock_file is not None:
+                self.journal = ReportJournal(self, lock_file, pending)
+                _journals[os.path.abspath(self.data_path)] = self.journal
+                atexit.register(self.journal.close)
+
+        if migrate:
+            self.migrate_legacy(legacy_path)
+            os.remove(migration_marker)
+
+    # Number of patients in the store
+    def __len__(self):
+        with self.lock:
+            self.refresh()
+            return len(self.index)
+
+    # Call callback(key, data) after any store on the same files saves a report
+    def add_save_listener(self, callback):
+        _save_listeners.setdefault(os.path.abspath(self.data_path), []).append(callback)
+
+    # Stop calling a callback registered with add_save_listener
+    def remove_save_listener(self, callback):
+        listeners = _save_listeners.get(os.path.abspath(self.data_path), [])
+        if callback in listeners:
+            listeners.remove(callback)
+
+    # Keyed hash of a patient key, used as the index key
+    def digest(self, key):
+        return hmac.new(self.index_secret, key.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    # Start an empty store with a fresh index secret
+    def create_index(self):
+        self.index_secret = secrets.token_bytes(32)
+        header = INDEX_MAGIC + b" " + self.cipher_suite.encrypt(self.index_secret) + b"\n"
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+        os.replace(tmp_path, self.index_path)
+        self.index = {}
+        self.index_offset = len(header)
+
+    # Read the index file; when repairing, drop torn lines and index records written after it (e.g. after a crash)
+    def load_index(self, repair=True):
+        with open(self.index_path, "rb") as f:
+            header = f.readline()
+            magic, _, token = header.strip().partition(b" ")
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"'{self.index_path}' is not a report index.")
+            self.index_secret = self.cipher_suite.decrypt(token)
+            self.index_offset = len(header)
+        self.refresh()
+        if repair:
+            self.truncate_partial_line(self.index_path)
+            self.recover_tail()
+
+    # Recreate the index by decrypting every record
+    def rebuild_index(self):
+        self.create_index()
+        self.recover_tail()
+
+    # Drop a half written last line left by an interrupted write, never a complete line before it
+    @staticmethod
+    def truncate_partial_line(path):
+        with open(path, "rb+") as f:
+            size = end = f.seek(0, os.SEEK_END)
+            # A torn record can be longer than one block, scan back to the last newline
+            while end > 0:
+                step = min(65536, end)
+                f.seek(end - step)
+                cut = f.read(step).rfind(b"\n")
+                if cut >= 0:
+                    end = end - step + cut + 1
+                    break
+                end -= step
+            if end < size:
+                f.truncate(end)
+
+    # Add index entries for records past the last indexed one
+    def recover_tail(self):
+        if not os.path.exists(self.data_path):
+            return
+        self.truncate_partial_line(self.data_path)
+        indexed_end = max((offset + length + 1 for offset, length in self.index.values()), default=0)
+        entries = []
+        with open(self.data_path, "rb") as f:
+            f.seek(indexed_end)
+            offset = indexed_end
+            for line in f:
+                token = line.rstrip(b"\n")
+                record = json.loads(self.cipher_suite.decrypt(token))
+                entries.append((self.digest(record["key"]), offset, len(token)))
+                offset += len(line)
+        if entries:
+            self.append_index(entries)
+
+    # Pick up index entries appended by other store instances
+    def refresh(self):
+        try:
+            size = os.path.getsize(self.index_path)
+        except FileNotFoundError:
+            return
+        if size <= self.index_offset:
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self.index_offset)
+            chunk = f.read(size - self.index_offset)
+        # Only complete lines, a partial one is still being written
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            digest, offset, length = line.decode('ascii').split()
+            self.index[digest] = (int(offset), int(length))
+        self.index_offset += end
+
+    # Append entries to the index file and the in-memory index
+    def append_index(self, entries):
+        lines = "".join(f"{digest} {offset} {length}\n" for digest, offset, length in entries)
+        with open(self.index_path, "ab") as f:
+            f.write(lines.encode('ascii'))
+        for digest, offset, length in entries:
+            self.index[digest] = (offset, length)
+        self.index_offset += len(lines)
+
+    # Encrypt and durably append one report, O(1) regardless of store size
+    @timed("store.save")
+    def save(self, key, data):
+        self.save_many([(key, data)])
+
+    # Encrypt and durably append several reports with a single journal commit
+    def save_many(self, reports):
+        if self.journal is None:
+            raise RuntimeError(f"'{self.data_path}' is open read only or for writing in another process.")
+        with span("store.serialize"):
+            plaintexts = [json.dumps({"key": key, "data": data}).encode('utf-8') for key, data in reports]
+        with span("store.encrypt"):
+            tokens = [self.cipher_suite.encrypt(plaintext) for plaintext in plaintexts]
+        with span("store.write"):
+            self.journal.commit([(key, token) for (key, _), token in zip(reports, tokens)])
+        with span("store.listeners"):
+            for key, data in reports:
+                for callback in _save_listeners.get(os.path.abspath(self.data_path), ()):
+                    callback(key, data)
+
+    # Append journaled records [(key, token)] to the data file and the index, called by the journal
+    def apply(self, records):
+        with self.lock:
+            self.refresh()
+            with open(self.data_path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                entries = []
+                for key, token in records:
+                    entries.append((self.digest(key), offset, len(token)))
+                    offset += len(token) + 1
+                f.write(b"".join(token + b"\n" for _, token in records))
+            self.append_index(entries)
+
+    # Patient key inside an encrypted record, used to replay the journal
+    def record_key(self, token):
+        return json.loads(self.cipher_suite.decrypt(token))["key"]
+
+    # Read and decrypt the record at offset
+    def read_record(self, offset, length):
+        with span("store.read"):
+            with open(self.data_path, "rb") as f:
+                f.seek(offset)
+                token = f.read(length)
+        with span("store.decrypt"):
+            plaintext = self.decrypt_record(token, offset)
+        with span("store.parse"):
+            return json.loads(plaintext)
+
+    # Decrypt the token read at offset, reading it again if rotate_key.py was rewriting it
+    def decrypt_record(self, token, offset):
+        try:
+            return self.cipher_suite.decrypt(token)
+        except InvalidToken:
+            with open(self.data_path, "rb") as f:
+                f.seek(offset)
+                return self.cipher_suite.decrypt(f.read(len(token)))
+
+    # Look up one report by key, None if the patient is unknown
+    @timed("store.get")
+    def get(self, key):
+        with self.lock:
+            self.refresh()
+            location = self.index.get(self.digest(key))
+        if location is None:
+            return None
+        return self.read_record(*location)["data"]
+
+    # Check if a patient has a report
+    def __contains__(self, key):
+        with self.lock:
+            self.refresh()
+            return self.digest(key) in self.index
+
+    # (offset, length) of the latest record of every patient, in file order
+    def locations(self):
+        with self.lock:
+            self.refresh()
+            return sorted(self.index.values())
+
+    # Yield (key, report) for the latest record of every patient, one at a time
+    def iter_reports(self):
+        locations = self.locations()
+        if not locations:
+            return
+        with open(self.data_path, "rb") as f:
+            for offset, length in locations:
+                f.seek(offset)
+                record = json.loads(self.decrypt_record(f.read(length), offset))
+                yield record["key"], record["data"]
+
+    # Import every report from the old single-blob 'hdisrep.json'
+    def migrate_legacy(self, legacy_path):
+        with open(legacy_path, "rb") as f:
+            encrypted_data = f.read()
+        if not encrypted_data:
+            return 0
+        reports = json.loads(self.cipher_suite.decrypt(encrypted_data).decode('utf-8'))
+        self.save_many(list(reports.items()))
+        return len(reports)
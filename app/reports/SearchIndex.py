@@ -0,0 +1,155 @@
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+"""
+- In-memory patient name index built from the decrypted reports.
+- Case-insensitive prefix search on last and first names through sorted lists (bisect).
+- Typo tolerant search through a symmetric delete index: every name is stored under all the
+  strings obtained by deleting up to max_distance characters, so a query only looks up its own
+  deletions instead of scanning every patient.
+"""
+
+
+# Collapse whitespace and ignore case
+def normalize(name):
+    return " ".join(name.split()).casefold()
+
+
+# All strings obtained by deleting up to max_distance characters
+def deletes(word, max_distance):
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+# Levenshtein distance, stops early once it exceeds max_distance
+def edit_distance(a, b, max_distance):
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class SearchIndex:
+
+    # Constructor
+    def __init__(self, max_distance=2):
+        self.max_distance = max_distance
+        self.patients = {}
+        self.by_last = defaultdict(set)
+        self.by_first = defaultdict(set)
+        self.sorted_last = []
+        self.sorted_first = []
+        self.variants = defaultdict(set)
+        self.indexed_names = set()
+        self.lock = threading.Lock()
+
+    # Build the index from every report in a store, kept current by its save listener.
+    # Returns None if cancel_event is set while building.
+    @classmethod
+    def from_store(cls, store, max_distance=2, cancel_event=None):
+        index = cls(max_distance)
+        # Listen first, so a report saved during the build is not missed (add skips known keys)
+        store.add_save_listener(index.add)
+        for key, report in store.iter_reports():
+            if cancel_event is not None and cancel_event.is_set():
+                store.remove_save_listener(index.add)
+                return None
+            index.add(key, report)
+        return index
+
+    # Number of indexed patients
+    def __len__(self):
+        return len(self.patients)
+
+    # Index one patient report
+    def add(self, key, report):
+        first_name = report.get("First Name", "").strip()
+        last_name = report.get("Last Name", "").strip()
+        date_of_birth = report.get("Date of Birth", "").strip()
+        first, last = normalize(first_name), normalize(last_name)
+
+        with self.lock:
+            if key in self.patients:
+                return
+            self.patients[key] = (first, last, date_of_birth, f"{first_name} {last_name} ({date_of_birth})")
+            if last not in self.by_last:
+                insort(self.sorted_last, last)
+            if first not in self.by_first:
+                insort(self.sorted_first, first)
+            self.by_last[last].add(key)
+            self.by_first[first].add(key)
+            for name in (first, last):
+                if name not in self.indexed_names:
+                    self.indexed_names.add(name)
+                    for variant in deletes(name, self.max_distance):
+                        self.variants[variant].add(name)
+
+    # Indexed names within a few edits of query (one per three characters, up to max_distance)
+    def similar_names(self, query):
+        max_distance = min(self.max_distance, len(query) // 3)
+        found = {}
+        for variant in deletes(query, max_distance):
+            for name in self.variants.get(variant, ()):
+                if name not in found:
+                    distance = edit_distance(query, name, max_distance)
+                    if distance <= max_distance:
+                        found[name] = distance
+        return found
+
+    # Names from a sorted list starting with prefix, at most limit of them
+    @staticmethod
+    def names_with_prefix(sorted_names, prefix, limit):
+        names = []
+        i = bisect_left(sorted_names, prefix)
+        while i < len(sorted_names) and len(names) < limit and sorted_names[i].startswith(prefix):
+            names.append(sorted_names[i])
+            i += 1
+        return names
+
+    # Ranked (key, display text) candidates for a possibly misspelled or partial name
+    def search(self, first_name, last_name, date_of_birth=None, limit=20):
+        first, last = normalize(first_name), normalize(last_name)
+        with self.lock:
+            # Score for every candidate last name: exact 0, prefix 0.5, otherwise edit distance
+            last_scores = {name: 0.5 for name in self.names_with_prefix(self.sorted_last, last, limit * 5)}
+            for name, distance in self.similar_names(last).items():
+                last_scores[name] = min(distance, last_scores.get(name, distance))
+            if last in self.by_last:
+                last_scores[last] = 0
+
+            # Same for first name when it was given
+            first_scores = None
+            if first:
+                first_scores = {name: 0.5 for name in self.names_with_prefix(self.sorted_first, first, limit * 5)}
+                for name, distance in self.similar_names(first).items():
+                    first_scores[name] = min(distance, first_scores.get(name, distance))
+                if first in self.by_first:
+                    first_scores[first] = 0
+
+            candidates = []
+            for name, last_score in last_scores.items():
+                for key in self.by_last.get(name, ()):
+                    patient_first, _, patient_dob, display = self.patients[key]
+                    score = last_score
+                    if first_scores is not None:
+                        if patient_first not in first_scores:
+                            continue
+                        score += first_scores[patient_first]
+                    if date_of_birth and patient_dob != date_of_birth:
+                        score += 1
+                    candidates.append((score, display, key))
+
+        candidates.sort()
+        return [(key, display) for _, display, key in candidates[:limit]]
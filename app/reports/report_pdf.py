@@ -0,0 +1,47 @@
+import re
+from fpdf import FPDF
+
+"""
+- PDF layout of a patient report, shared by the Get Patient Info tab and the bulk exporter.
+"""
+
+
+# FPDF with optional page numbers in the footer, for combined documents
+class ReportPDF(FPDF):
+
+    # Constructor
+    def __init__(self, numbered=False):
+        super().__init__()
+        self.numbered = numbered
+        if numbered:
+            self.alias_nb_pages()
+
+    # Page footer
+    def footer(self):
+        if self.numbered:
+            self.set_y(-15)
+            self.set_font("Arial", 'I', 8)
+            self.cell(0, 10, f"Page {self.page_no()}/{{nb}}", align="C")
+
+
+# Add one page with the patient's report
+def render_report(pdf, data):
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 16)
+
+    # Title
+    pdf.cell(0, 10, "Patient Report", ln=True, align="C")
+    pdf.ln(10)
+
+    # Set patient data in pdf
+    pdf.set_font("Arial", '', 12)
+    for key, value in data.items():
+        pdf.cell(0, 10, f"{key}: {value}", ln=True)
+
+
+# File name for a single patient's PDF
+def report_filename(data):
+    first_name = data.get("First Name", "")
+    last_name = data.get("Last Name", "")
+    date_of_birth = data.get("Date of Birth", "")
+    return re.sub(r'[\\/:*?"<>|]', "-", f"{first_name}_{last_name}_{date_of_birth}.pdf")
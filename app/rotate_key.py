@@ -0,0 +1,360 @@
+# rotate_key.py
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from cryptography.fernet import Fernet, InvalidToken
+from reports.KeyRing import KeyRing, KEY_CHECK_SECONDS
+from reports.ReportJournal import ReportJournal
+from reports.ReportStore import ReportStore, INDEX_MAGIC
+
+try:
+    import resource
+except ImportError:
+    # Windows, no peak memory in the summary
+    resource = None
+
+"""
+- Rotates the report encryption key: --new-key puts a new key in front of secret.key, the store
+  is re-encrypted with it and --retire later drops the old keys.
+- Records the apps save once they have picked up the new key (KEY_CHECK_SECONDS) are already
+  encrypted with it; the pass stops at the end of the data file at that point.
+- Re-encrypting a Fernet token keeps its length, so every record (old versions included) is
+  rewritten in place: the index stays valid and the app keeps reading while the tool runs, with
+  both keys (reports/KeyRing.py reloads the key file).
+- Worker processes read and re-encrypt line-aligned chunks of the data file straight from disk;
+  only a couple of chunks per worker are in flight, so memory does not grow with the store.
+- Chunks are written in file order. Each one is first saved with its position in
+  '<base>.rotate' (fsynced), then written over the old records: an interrupted run re-applies
+  that chunk and resumes after it.
+- --retire needs the app closed: it replays the app's journal, re-encrypts what is left,
+  checks that every record decrypts with the new key alone and only then rewrites secret.key.
+- Run from app/: python rotate_key.py --new-key, later python rotate_key.py --retire
+  (python rotate_key.py alone resumes an interrupted rotation).
+"""
+
+# Bytes of the data file per worker task
+CHUNK_SIZE = 1024 * 1024
+
+# Spawned workers do not inherit the rotation lock, it goes with the main process
+_mp_context = multiprocessing.get_context("spawn")
+
+# Worker process state
+_cipher = None
+_data_path = None
+
+
+# Open the keys once per worker, at a lower priority than the app
+def _init_worker(keys, data_path):
+    global _cipher, _data_path
+    if hasattr(os, "nice"):
+        os.nice(10)
+    _cipher = KeyRing.cipher_for(keys)
+    _data_path = data_path
+
+
+# Re-encrypt the records between start and stop with the newest key, returns (start, chunk, records)
+def _rotate_chunk(start, stop):
+    with open(_data_path, "rb") as f:
+        f.seek(start)
+        tokens = f.read(stop - start).split(b"\n")[:-1]
+    lines = []
+    offset = start
+    for token in tokens:
+        try:
+            rotated = _cipher.rotate(token)
+        except InvalidToken:
+            raise ValueError(f"The record at offset {offset} does not decrypt with any key in the key file.")
+        if len(rotated) != len(token):
+            raise ValueError(f"The record at offset {offset} changed length when re-encrypted.")
+        lines.append(rotated + b"\n")
+        offset += len(token) + 1
+    return start, b"".join(lines), len(tokens)
+
+
+# Count the records between start and stop that the given key alone cannot decrypt
+def _check_chunk(key, start, stop):
+    cipher = Fernet(key)
+    failed = 0
+    with open(_data_path, "rb") as f:
+        f.seek(start)
+        tokens = f.read(stop - start).split(b"\n")[:-1]
+    for token in tokens:
+        try:
+            cipher.decrypt(token)
+        except InvalidToken:
+            failed += 1
+    return failed, len(tokens)
+
+
+# fsync a directory so a rename in it is durable (not possible on Windows)
+def fsync_dir(path):
+    if os.name != 'posix':
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# End of the last complete line of a file, records being appended are left for the next pass
+def complete_end(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            step = min(65536, end)
+            f.seek(end - step)
+            cut = f.read(step).rfind(b"\n")
+            if cut >= 0:
+                return end - step + cut + 1
+            end -= step
+    return 0
+
+
+# Line-aligned (start, stop) ranges of about chunk_size bytes between two line boundaries
+def chunk_bounds(path, start, end, chunk_size=CHUNK_SIZE):
+    with open(path, "rb") as f:
+        while start < end:
+            stop = start + chunk_size
+            if stop >= end:
+                stop = end
+            else:
+                f.seek(stop)
+                stop = min(end, stop + len(f.readline()))
+            yield start, stop
+            start = stop
+
+
+class RotationCheckpoint:
+
+    # Constructor, the checkpoint file next to the store
+    def __init__(self, base_path):
+        self.path = f"{base_path}.rotate"
+        self.files = {"dat": f"{base_path}.dat", "idx": f"{base_path}.idx"}
+
+    # (state, chunk) of the last run, None if there is none
+    def read(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            state = json.loads(f.readline())
+            chunk = f.read()
+        if len(chunk) != state["length"]:
+            raise ValueError(f"'{self.path}' is damaged.")
+        return state, chunk
+
+    # Durably save the position and the chunk about to be written, then write it over the old records
+    def write_chunk(self, state, chunk):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps({**state, "length": len(chunk)}).encode('utf-8') + b"\n" + chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        fsync_dir(self.path)
+        self.apply(state, chunk)
+
+    # Write a saved chunk at its offset, again after an interruption
+    def apply(self, state, chunk):
+        with open(self.files[state["file"]], "r+b") as f:
+            f.seek(state["offset"])
+            f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+
+    # Forget the rotation once it is complete
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+            fsync_dir(self.path)
+
+
+# Re-encrypt the index header, every record and the legacy blob with the newest key, returns a summary dict
+def rotate_store(base_path, key_path, legacy_path=None, chunk_size=CHUNK_SIZE, workers=None):
+    keys = KeyRing(key_path)
+    fingerprint = KeyRing.fingerprint(keys.keys[0])
+    data_path = f"{base_path}.dat"
+    index_path = f"{base_path}.idx"
+    workers = workers or os.cpu_count() or 1
+    lock_file = ReportJournal.acquire_lock(f"{base_path}.rotate.lock")
+    if lock_file is None:
+        raise RuntimeError(f"Another rotation of '{base_path}' is running.")
+    checkpoint = RotationCheckpoint(base_path)
+
+    try:
+        # Finish the chunk an interrupted run was writing, then carry on after it (same new key)
+        done = records = 0
+        saved = checkpoint.read()
+        if saved is not None:
+            checkpoint.apply(*saved)
+        if saved is not None and saved[0]["key"] == fingerprint:
+            done, records = saved[0]["done"], saved[0]["records"]
+        else:
+            with open(index_path, "rb") as f:
+                header = f.readline()
+            token = header.strip().partition(b" ")[2]
+            checkpoint.write_chunk(
+                {"key": fingerprint, "file": "idx", "offset": 0, "done": 0, "records": 0},
+                INDEX_MAGIC + b" " + keys.rotate(token) + b"\n",
+            )
+        resumed_at = done
+
+        # A running app encrypts with the new key once it has seen the key file change,
+        # records it saves after that need no re-encryption (an app started later has the new key)
+        app_lock = ReportJournal.acquire_lock(f"{base_path}.lock")
+        if app_lock is None:
+            settle = os.path.getmtime(key_path) + 2 * KEY_CHECK_SECONDS - time.time()
+            if settle > 0:
+                time.sleep(settle)
+        else:
+            app_lock.close()
+        end = complete_end(data_path)
+
+        start = time.perf_counter()
+        rotated = chunks = 0
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context, initializer=_init_worker,
+                                 initargs=(keys.data, os.path.abspath(data_path))) as executor:
+            pending = set()
+            ready = {}
+            bounds = chunk_bounds(data_path, done, end, chunk_size)
+            while True:
+                # Keep only a couple of chunks per worker in flight or waiting to be written
+                while len(pending) + len(ready) < workers * 2:
+                    bound = next(bounds, None)
+                    if bound is None:
+                        break
+                    pending.add(executor.submit(_rotate_chunk, *bound))
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    chunk_start, chunk, count = future.result()
+                    ready[chunk_start] = (chunk, count)
+                # Write in file order, so everything before `done` is re-encrypted
+                while done in ready:
+                    chunk, count = ready.pop(done)
+                    records += count
+                    checkpoint.write_chunk(
+                        {"key": fingerprint, "file": "dat", "offset": done, "done": done + len(chunk),
+                         "records": records}, chunk,
+                    )
+                    done += len(chunk)
+                    rotated += count
+                    chunks += 1
+        elapsed = time.perf_counter() - start
+
+        if legacy_path and os.path.exists(legacy_path):
+            with open(legacy_path, "rb") as f:
+                encrypted_data = f.read()
+            if encrypted_data:
+                tmp_path = f"{legacy_path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(keys.rotate(encrypted_data))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, legacy_path)
+        checkpoint.remove()
+    finally:
+        lock_file.close()
+
+    # ru_maxrss is in KB on Linux
+    peak_self = peak_worker = None
+    if resource is not None:
+        peak_self = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        peak_worker = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return {
+        "records": records,
+        "rotated_this_run": rotated,
+        "resumed_at_mb": resumed_at / 1e6,
+        "megabytes": (done - resumed_at) / 1e6,
+        "chunks": chunks,
+        "workers": workers,
+        "seconds": elapsed,
+        "records_per_second": rotated / elapsed if elapsed else 0.0,
+        "megabytes_per_second": (done - resumed_at) / 1e6 / elapsed if elapsed else 0.0,
+        "peak_rss_main_mb": peak_self,
+        "peak_rss_worker_mb": peak_worker,
+    }
+
+
+# Number of records (index header and legacy blob included) the newest key alone cannot decrypt
+def check_newest_key(base_path, key_path, legacy_path=None, chunk_size=CHUNK_SIZE, workers=None):
+    keys = KeyRing(key_path)
+    cipher = Fernet(keys.keys[0])
+    data_path = f"{base_path}.dat"
+    workers = workers or os.cpu_count() or 1
+    failed = 0
+    tokens = []
+    with open(f"{base_path}.idx", "rb") as f:
+        tokens.append(f.readline().strip().partition(b" ")[2])
+    if legacy_path and os.path.exists(legacy_path) and os.path.getsize(legacy_path):
+        with open(legacy_path, "rb") as f:
+            tokens.append(f.read())
+    for token in tokens:
+        try:
+            cipher.decrypt(token)
+        except InvalidToken:
+            failed += 1
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context, initializer=_init_worker,
+                             initargs=(keys.data, os.path.abspath(data_path))) as executor:
+        futures = [executor.submit(_check_chunk, keys.keys[0], start, stop)
+                   for start, stop in chunk_bounds(data_path, 0, complete_end(data_path), chunk_size)]
+        for future in futures:
+            failed += future.result()[0]
+    return failed
+
+
+# With the app closed: fold its journal in, finish the rotation, check it and drop the old keys
+def retire_old_keys(base_path, key_path, legacy_path=None, chunk_size=CHUNK_SIZE, workers=None):
+    store = ReportStore(base_path, KeyRing(key_path))
+    if store.journal is None:
+        raise RuntimeError("The app has the report store open; close it before retiring the old keys.")
+    try:
+        # Records replayed from the journal can still be encrypted with an old key
+        summary = rotate_store(base_path, key_path, legacy_path, chunk_size, workers)
+        failed = check_newest_key(base_path, key_path, legacy_path, chunk_size, workers)
+        if failed:
+            raise RuntimeError(f"{failed} records do not decrypt with the new key; the old keys were kept.")
+    finally:
+        # Leaves an empty journal, nothing encrypted with an old key stays behind
+        store.journal.close()
+    summary["retired_keys"] = KeyRing.retire_old_keys(key_path)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rotate the key of the encrypted report store.")
+    parser.add_argument("--new-key", action="store_true", help="add a new key to the key file, then re-encrypt")
+    parser.add_argument("--retire", action="store_true", help="finish the rotation and drop the old keys (app closed)")
+    parser.add_argument("--store", default="hdisrep", help="report store path without extension")
+    parser.add_argument("--key", default="secret.key", help="encryption key file, one key per line")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-kb", type=int, default=CHUNK_SIZE // 1024, help="data file KB per worker task")
+    args = parser.parse_args()
+
+    legacy_path = f"{args.store}.json"
+    if args.new_key:
+        KeyRing.add_key(args.key)
+        print(f"New key added to {args.key}; running apps switch to it within a second.")
+    try:
+        if args.retire:
+            summary = retire_old_keys(args.store, args.key, legacy_path, args.chunk_kb * 1024, args.workers)
+        else:
+            summary = rotate_store(args.store, args.key, legacy_path, args.chunk_kb * 1024, args.workers)
+    except KeyboardInterrupt:
+        raise SystemExit("Interrupted; run the same command again to resume.")
+    if summary["resumed_at_mb"]:
+        print(f"Resumed after the first {summary['resumed_at_mb']:.1f} MB")
+    print(f"Re-encrypted {summary['rotated_this_run']} records ({summary['megabytes']:.1f} MB, {summary['chunks']} chunks) "
+          f"in {summary['seconds']:.2f}s with {summary['workers']} workers: {summary['records_per_second']:.0f} records/s, "
+          f"{summary['megabytes_per_second']:.1f} MB/s")
+    if summary["peak_rss_main_mb"] is not None:
+        print(f"Peak memory: main {summary['peak_rss_main_mb']:.0f} MB, largest worker {summary['peak_rss_worker_mb']:.0f} MB")
+    if args.retire:
+        print(f"Every record decrypts with the new key; {summary['retired_keys']} old keys removed from {args.key}")
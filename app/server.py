@@ -0,0 +1,269 @@
+# server.py
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from model.ModelLoader import ModelLoader
+from model.BatchingPredictor import BatchingPredictor
+from model.backends import BACKEND_PARAMS
+
+"""
+- Local HTTP/JSON prediction service around the Model, for the intake system.
+- POST /predict        one patient (form labels or dataset feature names) -> prediction
+- POST /predict/batch  {"patients": [...]} -> predictions
+- GET  /health         liveness, GET /ready readiness (503 until the model is loaded)
+- GET  /metrics        request counts, p50/p99 latency and batch sizes of this worker
+- Concurrent single requests are micro-batched into one vectorized predict call (BatchingPredictor).
+- With --workers N, N processes share the port (SO_REUSEPORT), each loading the model once.
+- --backend selects the tree, random forest or gradient boosting model; --compiled serves the
+  tree exported by export_predictor.py without importing sklearn or pandas.
+"""
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+           413: "Payload Too Large", 500: "Internal Server Error", 501: "Not Implemented",
+           503: "Service Unavailable"}
+
+RESULT_TEXT = {0: "NO signs of heart disease detected.", 1: "Signs of heart disease detected."}
+
+
+class HttpError(Exception):
+
+    # Constructor
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Rolling latency samples per endpoint
+class LatencyMetrics:
+
+    # Constructor
+    def __init__(self, window=10000):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.batch_sizes = deque(maxlen=window)
+        self.request_batch_sizes = deque(maxlen=window)
+        self.started = time.time()
+
+    # Record one request
+    def record(self, endpoint, seconds):
+        self.samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+        self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    # Percentile of a list of numbers (nearest rank)
+    @staticmethod
+    def percentile(values, q):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    # Count, mean and max of a list of batch sizes
+    @staticmethod
+    def batch_summary(sizes):
+        sizes = list(sizes)
+        return {
+            "count": len(sizes),
+            "mean_size": round(sum(sizes) / len(sizes), 2) if sizes else 0,
+            "max_size": max(sizes, default=0),
+        }
+
+    # Summary for the /metrics endpoint; "batches" are the micro-batches, "request_batches" the
+    # patients per /predict/batch request
+    def summary(self):
+        endpoints = {}
+        for endpoint, samples in self.samples.items():
+            endpoints[endpoint] = {
+                "count": self.counts[endpoint],
+                "p50_ms": round(self.percentile(samples, 50) * 1000, 3),
+                "p99_ms": round(self.percentile(samples, 99) * 1000, 3),
+            }
+        return {
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "endpoints": endpoints,
+            "batches": self.batch_summary(self.batch_sizes),
+            "request_batches": self.batch_summary(self.request_batch_sizes),
+        }
+
+
+# Response body for one prediction
+def prediction_body(prediction):
+    return {"prediction": prediction, "result": RESULT_TEXT.get(prediction, str(prediction))}
+
+
+class PredictionServer:
+
+    # Constructor
+    def __init__(self, loader, max_batch=64, window_ms=2.0):
+        self.loader = loader
+        self.metrics = LatencyMetrics()
+        self.batcher = None
+        self.max_batch = max_batch
+        self.window_ms = window_ms
+        # Batch requests and the per-row retries of a bad micro-batch run here, never on the event loop
+        self.executor = ThreadPoolExecutor(thread_name_prefix="predict")
+
+    # Model once it is loaded, 503 until then
+    def model(self):
+        if not self.loader.ready.is_set():
+            raise HttpError(503, "Model is still loading.")
+        if self.loader.error is not None:
+            raise HttpError(503, f"Model could not be loaded: {self.loader.error}")
+        if self.batcher is None:
+            self.batcher = BatchingPredictor(
+                self.loader.model, encode=self.loader.model.encoder.encode, max_batch=self.max_batch,
+                window_ms=self.window_ms, executor=self.executor,
+            )
+            self.metrics.batch_sizes = self.batcher.batch_sizes
+        return self.loader.model
+
+    # Route one request, returns (status, body)
+    async def dispatch(self, method, path, body):
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/ready":
+            self.model()
+            return 200, {"status": "ready"}
+        if path == "/metrics":
+            return 200, self.metrics.summary()
+        if path in ("/predict", "/predict/batch"):
+            if method != "POST":
+                raise HttpError(405, "Use POST.")
+            try:
+                payload = json.loads(body or b"null")
+            except ValueError as e:
+                raise HttpError(400, "Body must be JSON.") from e
+            model = self.model()
+            try:
+                if path == "/predict":
+                    prediction = await asyncio.wrap_future(self.batcher.submit(payload))
+                    return 200, prediction_body(int(prediction))
+                patients = payload.get("patients") if isinstance(payload, dict) else payload
+                if not isinstance(patients, list):
+                    raise ValueError("Expected {\"patients\": [...]}.")
+                if not patients:
+                    return 200, {"predictions": []}
+                self.metrics.request_batch_sizes.append(len(patients))
+                predictions = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, lambda: model.predict(model.encoder.encode(patients))
+                )
+                return 200, {"predictions": [prediction_body(int(p)) for p in predictions]}
+            except ValueError as e:
+                raise HttpError(400, str(e)) from e
+        raise HttpError(404, f"Unknown path '{path}'.")
+
+    # Serve one connection, keeping it alive between requests
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                start = time.perf_counter()
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                path = target.split("?", 1)[0]
+                framing_error = False
+
+                try:
+                    coding = headers.get("transfer-encoding")
+                    # Only Content-Length framed bodies are read; a chunked body would be taken for a new request
+                    if coding is not None:
+                        framing_error = True
+                        if coding.lower() == "chunked":
+                            raise HttpError(411, "Chunked bodies are not supported, send a Content-Length.")
+                        raise HttpError(501, f"Unsupported Transfer-Encoding '{coding}'.")
+                    length = headers.get("content-length", "0")
+                    # Without a valid length the body cannot be skipped, so the connection is closed
+                    if not (length.isascii() and length.isdigit()):
+                        framing_error = True
+                        raise HttpError(400, "Invalid Content-Length.")
+                    length = int(length)
+                    if length > MAX_BODY_BYTES:
+                        framing_error = True
+                        raise HttpError(413, "Request body too large.")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.dispatch(method, path, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except asyncio.IncompleteReadError:
+                    return
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                              and not framing_error)
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                self.metrics.record(path, time.perf_counter() - start)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    # Listen until cancelled
+    async def serve(self, host, port, reuse_port=False):
+        server = await asyncio.start_server(self.handle, host, port, reuse_port=reuse_port or None)
+        async with server:
+            await server.serve_forever()
+
+
+# Entry point of one worker process
+def run_worker(host, port, max_batch, window_ms, reuse_port, backend="tree", compiled=False):
+    server = PredictionServer(ModelLoader(compiled=compiled, backend=backend), max_batch=max_batch, window_ms=window_ms)
+    print(f"Worker {os.getpid()} listening on http://{host}:{port}")
+    try:
+        asyncio.run(server.serve(host, port, reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve heart disease predictions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes sharing the port")
+    parser.add_argument("--max-batch", type=int, default=64, help="largest micro-batch")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="how long to wait for more requests")
+    parser.add_argument("--backend", choices=list(BACKEND_PARAMS), default="tree", help="model backend")
+    parser.add_argument("--compiled", action="store_true", help="serve the exported tree (export_predictor.py)")
+    args = parser.parse_args()
+
+    if args.workers == 1:
+        run_worker(args.host, args.port, args.max_batch, args.window_ms, False, args.backend, args.compiled)
+    else:
+        processes = [
+            multiprocessing.Process(
+                target=run_worker,
+                args=(args.host, args.port, args.max_batch, args.window_ms, True, args.backend, args.compiled),
+            )
+            for _ in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
@@ -0,0 +1,122 @@
+import threading
+import tkinter as tk
+from tkinter import ttk
+from concurrent.futures import ThreadPoolExecutor
+
+"""
+- Runs slow work (prediction, encryption, file I/O) off the Tk main thread.
+- Tk is not thread safe, so results are handed back by polling the future with widget.after.
+- BusyIndicator shows a progress bar and a Cancel button while a job runs.
+"""
+
+
+class Job:
+
+    # Constructor
+    def __init__(self):
+        self.future = None
+        self.cancel_event = threading.Event()
+
+    # Ask the job to stop; its callbacks will not run
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+
+class BackgroundWorker:
+
+    # Constructor
+    def __init__(self, widget, max_workers=2, poll_ms=20):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hda-worker")
+
+    # Run fn(*args) on a worker thread; callbacks run on the Tk thread.
+    # With cancellable=True fn also gets cancel_event=... to stop early.
+    def submit(self, fn, *args, on_done=None, on_error=None, on_finish=None, cancellable=False):
+        job = Job()
+        kwargs = {"cancel_event": job.cancel_event} if cancellable else {}
+        job.future = self.executor.submit(fn, *args, **kwargs)
+        self.widget.after(self.poll_ms, self._poll, job, on_done, on_error, on_finish)
+        return job
+
+    # Check the job from the Tk thread until it finishes
+    def _poll(self, job, on_done, on_error, on_finish):
+        if not job.future.done():
+            self.widget.after(self.poll_ms, self._poll, job, on_done, on_error, on_finish)
+            return
+        # A cancelled job was already cleaned up by whoever cancelled it
+        if job.cancelled or job.future.cancelled():
+            return
+        try:
+            error = job.future.exception()
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+            elif on_done is not None:
+                on_done(job.future.result())
+        finally:
+            if on_finish is not None:
+                on_finish()
+
+    # Stop accepting work; jobs already running (e.g. a save) are allowed to finish
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class BusyIndicator:
+
+    # Constructor, idle until start is called
+    def __init__(self, parent):
+        self.frame = ttk.Frame(parent)
+        self.label = ttk.Label(self.frame, text="")
+        self.label.pack(side="left", padx=5)
+        self.progress = ttk.Progressbar(self.frame, mode="indeterminate", length=200)
+        self.progress.pack(side="left", padx=5)
+        self.cancel_button = tk.Button(
+            self.frame,
+            text="Cancel",
+            command=self.cancel,
+            font=("Arial", 10),
+            padx=5,
+            pady=2,
+        )
+        self.cancel_button.pack(side="left", padx=5)
+        self.cancel_button.config(state="disabled")
+        self.job = None
+        self.disabled = []
+
+    # Show the indicator for job and disable widgets until it ends
+    def start(self, text, job, disable=()):
+        self.job = job
+        self.disabled = list(disable)
+        for widget in self.disabled:
+            widget.config(state="disabled")
+        self.label.config(text=text)
+        self.cancel_button.config(state="normal")
+        self.progress.start(10)
+
+    # Hide the indicator and re-enable widgets
+    def stop(self):
+        self.job = None
+        self.progress.stop()
+        self.label.config(text="")
+        self.cancel_button.config(state="disabled")
+        for widget in self.disabled:
+            widget.config(state="normal")
+        self.disabled = []
+
+    # Cancel the running job
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.stop()
+
+    @property
+    def busy(self):
+        return self.job is not None
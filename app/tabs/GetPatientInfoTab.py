@@ -1,15 +1,20 @@
 import tkinter as tk
 from tkinter import ttk, messagebox as mb
 from tkcalendar import DateEntry
-import json
 import os
 import sys
-from cryptography.fernet import Fernet
-from fpdf import FPDF
+from reports.KeyRing import KeyRing
+from reports.ReportStore import ReportStore
+from reports.ReportCache import ReportCache
+from reports.SearchIndex import SearchIndex
+from tabs.BackgroundWorker import BackgroundWorker, BusyIndicator
+from instrumentation import span, timed
 
 """
-- Retrieves decrypted patient information from 'hdisrep.json' file.
+- Retrieves decrypted patient information from the encrypted report store.
+- Suggests close matches (partial or misspelled names) in a selectable list.
 - Displays patient information in a text box.
+- Lookups run on a background worker so the window stays responsive.
 - Allows user to print the patient information as a PDF.
 """
 
@@ -18,8 +23,15 @@ class GetPatientInfoTab:
     # Constructor
     def __init__(self, parent):
         self.frame = ttk.Frame(parent)
-        self.key = self.load_key()
-        self.cipher_suite = Fernet(self.key)
+        self.cipher_suite = self.load_key()
+        self.store = ReportStore(
+            self.resource_path("hdisrep"), self.cipher_suite, legacy_path=self.resource_path("hdisrep.json")
+        )
+        self.cache = ReportCache(self.store)
+        # Name index, built on the first search that misses
+        self.search_index = None
+        self.match_keys = []
+        self.worker = BackgroundWorker(self.frame)
         self.create_widgets()
         self.patient_data = None 
 
@@ -33,13 +45,11 @@ class GetPatientInfoTab:
 
         return os.path.join(base_path, relative_path)
 
-    # Load encryption key
+    # Load encryption keys, every key in secret.key decrypts and the newest encrypts
     def load_key(self):
         try:
             key_path = self.resource_path('secret.key')
-            with open(key_path, 'rb') as key_file:
-                key = key_file.read()
-            return key
+            return KeyRing(key_path)
         except FileNotFoundError:
             mb.showerror("Error", "Encryption key 'secret.key' not found. Please ensure it exists in the application directory.")
             raise
@@ -74,7 +84,7 @@ class GetPatientInfoTab:
         self.dob_entry.grid(row=2, column=1, pady=5)
 
         # Search Button
-        tk.Button(
+        self.search_button = tk.Button(
             search_frame,
             text="Search",
             command=self.get_patient_info,
@@ -83,7 +93,19 @@ class GetPatientInfoTab:
             fg="white",
             padx=10,
             pady=5,
-        ).grid(row=3, column=0, columnspan=2, pady=10)
+        )
+        self.search_button.grid(row=3, column=0, columnspan=2, pady=10)
+
+        # Busy indicator for background work
+        self.busy = BusyIndicator(search_frame)
+        self.busy.frame.grid(row=4, column=0, columnspan=2)
+
+        # Close matches frame
+        matches_frame = ttk.LabelFrame(self.frame, text="Close Matches", padding=(20, 10))
+        matches_frame.pack(fill="x", padx=20, pady=10)
+        self.matches_list = tk.Listbox(matches_frame, height=5, activestyle="dotbox")
+        self.matches_list.pack(fill="x")
+        self.matches_list.bind("<<ListboxSelect>>", self.select_match)
 
         # Patient report frame
         self.report_frame = ttk.LabelFrame(self.frame, text="Patient Report", padding=(20, 10))
@@ -112,43 +134,101 @@ class GetPatientInfoTab:
         date_of_birth = self.dob_entry.get().strip()
 
         # Entry validation
-        if not first_name or not last_name or not date_of_birth:
-            mb.showerror("Error", "Please enter the patient's first name, last name, and date of birth.")
+        if not last_name:
+            mb.showerror("Error", "Please enter at least the patient's last name.")
             return
 
-        # Create key for patient data entry in json file
+        # Look up on a worker thread, decryption and the first index build can be slow
+        job = self.worker.submit(
+            self.lookup_patient,
+            first_name,
+            last_name,
+            date_of_birth,
+            on_done=self.show_lookup,
+            on_error=lambda e: mb.showerror("Error", f"An error occurred while retrieving data: {e}"),
+            on_finish=self.busy.stop,
+            cancellable=True,
+        )
+        self.busy.start("Searching...", job, disable=[self.search_button])
+
+    # Find the patient's report or close matches (runs on a worker thread)
+    @timed("lookup.patient")
+    def lookup_patient(self, first_name, last_name, date_of_birth, cancel_event=None):
+        if len(self.store) == 0:
+            return None, None
+
+        # Create key for patient data entry in the report store, decrypted only if not cached
         key = f"{first_name}_{last_name}_{date_of_birth}"
+        with span("lookup.exact"):
+            patient_data = self.cache.get(key) if first_name else None
+        if patient_data is not None:
+            return patient_data, []
 
-        # Load and decrypt reports
-        try:
-            hdisrep_path = self.resource_path("hdisrep.json")
-            if not os.path.exists(hdisrep_path):
-                mb.showerror("Error", "No patient reports found ('hdisrep.json' is missing).")
-                return
-
-            with open(hdisrep_path, "rb") as f:
-                encrypted_data = f.read()
-                if encrypted_data:
-                    decrypted_data = self.cipher_suite.decrypt(encrypted_data)
-                    reports = json.loads(decrypted_data.decode('utf-8'))
-                else:
-                    mb.showerror("Error", "No patient reports found in 'hdisrep.json'.")
-                    return
-        except Exception as e:
-            mb.showerror("Error", f"An error occurred while retrieving data: {e}")
+        # No exact match, look for partial or misspelled names
+        if self.search_index is None:
+            with span("lookup.index_build"):
+                search_index = SearchIndex.from_store(self.store, cancel_event=cancel_event)
+            if search_index is None:
+                return None, []
+            self.search_index = search_index
+        with span("lookup.search"):
+            return None, self.search_index.search(first_name, last_name, date_of_birth)
+
+    # Show lookup results
+    def show_lookup(self, result):
+        patient_data, matches = result
+        if matches is None:
+            mb.showerror("Error", "No patient reports found.")
             return
 
         # Retrieve patient data
-        if key in reports:
-            self.patient_data = reports[key]
-            self.display_patient_info(self.patient_data)
-            self.print_button.config(state="normal")  
+        self.show_matches(matches)
+        if patient_data is not None:
+            self.show_patient(patient_data)
         else:
+            self.clear_report()
+            if not matches:
+                mb.showerror("Error", "Patient not found.")
+
+    # Keep and display one patient's report
+    def show_patient(self, patient_data):
+        if patient_data is None:
             mb.showerror("Error", "Patient not found.")
-            self.report_text.config(state="normal")
-            self.report_text.delete("1.0", tk.END)
-            self.report_text.config(state="disabled")
-            self.print_button.config(state="disabled")
+            return
+        self.patient_data = patient_data
+        self.display_patient_info(self.patient_data)
+        self.print_button.config(state="normal")  
+
+    # Fill the close matches list
+    def show_matches(self, matches):
+        self.match_keys = [key for key, _ in matches]
+        self.matches_list.delete(0, tk.END)
+        for _, display in matches:
+            self.matches_list.insert(tk.END, display)
+
+    # Show the report of the selected close match
+    def select_match(self, event=None):
+        selection = self.matches_list.curselection()
+        if not selection:
+            return
+        if self.busy.busy:
+            return
+        job = self.worker.submit(
+            self.cache.get,
+            self.match_keys[selection[0]],
+            on_done=self.show_patient,
+            on_error=lambda e: mb.showerror("Error", f"An error occurred while retrieving data: {e}"),
+            on_finish=self.busy.stop,
+        )
+        self.busy.start("Loading report...", job, disable=[self.search_button])
+
+    # Empty the report box
+    def clear_report(self):
+        self.patient_data = None
+        self.report_text.config(state="normal")
+        self.report_text.delete("1.0", tk.END)
+        self.report_text.config(state="disabled")
+        self.print_button.config(state="disabled")
 
     # Show patient information in text box
     def display_patient_info(self, data):
@@ -166,29 +246,17 @@ class GetPatientInfoTab:
             mb.showerror("Error", "No patient data to print.")
             return
 
-        # Get patient data
-        first_name = self.patient_data.get("First Name", "")
-        last_name = self.patient_data.get("Last Name", "")
-        date_of_birth = self.patient_data.get("Date of Birth", "")
-
-        # Create PDF
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', 16)
-
-        # Title
-        pdf.cell(0, 10, "Patient Report", ln=True, align="C")
-        pdf.ln(10)
-
-        # Set patient data in pdf
-        pdf.set_font("Arial", '', 12)
-        for key, value in self.patient_data.items():
-            pdf.cell(0, 10, f"{key}: {value}", ln=True)
+        # Create PDF, fpdf is imported on first use to keep it out of startup
+        from reports.report_pdf import ReportPDF, render_report, report_filename
+        with span("pdf.render"):
+            pdf = ReportPDF()
+            render_report(pdf, self.patient_data)
 
         # Save PDF file
-        filename = f"{first_name}_{last_name}_{date_of_birth}.pdf"
+        filename = report_filename(self.patient_data)
         try:
-            pdf.output(filename)
+            with span("pdf.write"):
+                pdf.output(filename)
             mb.showinfo("Success", f"PDF report saved as '{filename}'.")
         except Exception as e:
             mb.showerror("Error", f"An error occurred while saving the PDF: {e}")
@@ -1,26 +1,36 @@
 import tkinter as tk
 from tkinter import ttk, messagebox as mb
 from tkcalendar import DateEntry
-import pandas as pd
-import json
 import os
 import sys
-from cryptography.fernet import Fernet
-from fpdf import FPDF
+from reports.KeyRing import KeyRing
+from reports.ReportStore import ReportStore
+from model.Retrainer import Retrainer
+from tabs.BackgroundWorker import BackgroundWorker, BusyIndicator
+from instrumentation import span
 
 """
 - Tab containing a form to collect patient information and make predictions.
 - Allows saving the patient data and prediction result to an encrypted file.
 - Uses the model to make predictions based on the input data.
+- Prediction and saving run on a background worker so the window stays responsive.
+- Reports saved with a confirmed diagnosis are used to retrain the model in the background.
 """
 class PatientFormTab:
+    # Features of the last patient submitted in this window, for the graph tab
+    last_features = None
+
     # Constructor
     def __init__(self, parent, model):
         self.frame = ttk.Frame(parent)
         self.model = model 
         self.prediction_result = None
-        self.key = self.load_key()
-        self.cipher_suite = Fernet(self.key)
+        self.cipher_suite = self.load_key()
+        self.store = ReportStore(
+            self.resource_path("hdisrep"), self.cipher_suite, legacy_path=self.resource_path("hdisrep.json")
+        )
+        self.worker = BackgroundWorker(self.frame)
+        self.retrainer = Retrainer(self.model, self.store)
         self.create_widgets()
 
     # Find file using relative path
@@ -31,13 +41,11 @@ class PatientFormTab:
             base_path = os.path.abspath(".")
         return os.path.join(base_path, relative_path)
 
-    # Get key
+    # Get keys, every key in secret.key decrypts and the newest encrypts
     def load_key(self):
         key_path = self.resource_path("secret.key")
         try:
-            with open(key_path, 'rb') as key_file:
-                key = key_file.read()
-            return key
+            return KeyRing(key_path)
         except FileNotFoundError:
             mb.showerror("Error", "Encryption key file 'secret.key' not found.")
             raise
@@ -71,6 +79,7 @@ class PatientFormTab:
             ("Slope of Peak Exercise ST Segment:", ["Upsloping", "Flat", "Downsloping"]),
             ("Number of Major Vessels:", ["0", "1", "2", "3"]),
             ("Thalassemia:", ["Normal", "Fixed Defect", "Reversible Defect"]),
+            ("Confirmed Diagnosis:", ["Unconfirmed", "No Heart Disease", "Heart Disease"]),
         ]
 
         # Dictionary to store widget references
@@ -98,6 +107,9 @@ class PatientFormTab:
                     width=field_width,
                     state="readonly"
                 )
+                # Only set once the diagnosis is confirmed, e.g. when the report is updated later
+                if label == "Confirmed Diagnosis:":
+                    widget.set("Unconfirmed")
             elif value == "date": 
                 widget = DateEntry(
                     parent_frame,
@@ -117,7 +129,7 @@ class PatientFormTab:
         button_frame.pack(pady=20)
 
         # Submit button
-        tk.Button(
+        self.submit_button = tk.Button(
             button_frame,
             text="Submit",
             command=self.submit_info,
@@ -126,10 +138,11 @@ class PatientFormTab:
             fg="white",
             padx=10,
             pady=5,
-        ).pack(side="left", padx=10)
+        )
+        self.submit_button.pack(side="left", padx=10)
 
         # Save Report button
-        tk.Button(
+        self.save_button = tk.Button(
             button_frame,
             text="Save Report",
             command=self.save_report,
@@ -138,7 +151,12 @@ class PatientFormTab:
             fg="white",
             padx=10,
             pady=5,
-        ).pack(side="left", padx=10)
+        )
+        self.save_button.pack(side="left", padx=10)
+
+        # Busy indicator for background work
+        self.busy = BusyIndicator(self.frame)
+        self.busy.frame.pack(pady=5)
 
     # Send patient info to json
     def submit_info(self):
@@ -153,104 +171,37 @@ class PatientFormTab:
 
         # Process data
         data = {label.strip(':'): widget.get() for label, widget in self.widgets.items()}
-        print("Collected Data:", data)  # Debugging line
 
-        # Preprocess data to match model data
-        try:
+        # Preprocess data and predict on a worker thread
+        job = self.worker.submit(
+            self.predict_data,
+            data,
+            on_done=self.show_result,
+            on_error=lambda e: mb.showerror("Error", f"An error occurred during calculations: {e}"),
+            on_finish=self.busy.stop,
+        )
+        self.busy.start("Calculating...", job, disable=[self.submit_button, self.save_button])
+
+    # Preprocess data to match model data and predict, returns (features, prediction) (runs on a worker thread)
+    def predict_data(self, data):
+        with span("form.preprocess"):
             input_data = self.preprocess_data(data)
-            print("Preprocessed Data:", input_data)  # Debugging line
-            prediction = self.model.predict(input_data)
-            result = prediction[0]
-
-            # Store prediction
-            self.prediction_result = result
-
-            # Display result
-            if result == 0:
-                mb.showinfo("Result", "NO signs of heart disease detected.")
-            else:
-                mb.showinfo("Result", "Signs of heart disease detected.")
-        except Exception as e:
-            mb.showerror("Error", f"An error occurred during calculations: {e}")
+        with span("form.predict"):
+            return input_data, self.model.predict(input_data)[0]
+
+    # Store and display prediction
+    def show_result(self, prediction):
+        features, result = prediction
+        self.prediction_result = result
+        PatientFormTab.last_features = features
+        if result == 0:
+            mb.showinfo("Result", "NO signs of heart disease detected.")
+        else:
+            mb.showinfo("Result", "Signs of heart disease detected.")
 
-    # Preprocess data
+    # Preprocess data with the model's encoder, shared with the batch tools
     def preprocess_data(self, data):
-        # Map user input to model value
-        mapping = {
-            "Sex": {"Male": 1, "Female": 0},
-            "Age": lambda x: float(x),
-            "Serum Cholesterol (mg/dL)": lambda x: float(x),
-            "Max Heart Rate (BPM)": lambda x: float(x),
-            "ST Depression": lambda x: float(x),
-            "Fasting Blood Sugar > 120 mg/dL": {"Yes": 1, "No": 0},
-            "Exercise Induced Angina": {"Yes": 1, "No": 0},
-            "Chest Pain Type (0-3)": {"0": 0, "1": 1, "2": 2, "3": 3},
-            "Resting ECG": {"Normal": 0, "ST-T Wave Abnormality": 1, "Left Ventricular Hypertrophy": 2},
-            "Slope of Peak Exercise ST Segment": {"Upsloping": 0, "Flat": 1, "Downsloping": 2},
-            "Number of Major Vessels": {"0": 0, "1": 1, "2": 2, "3": 3},
-            "Thalassemia": {"Normal": 3, "Fixed Defect": 6, "Reversible Defect": 7},
-        }
-
-        # Map of GUI labels to feature names
-        label_to_feature = {
-            "Age": "age",
-            "Sex": "sex",
-            "Chest Pain Type (0-3)": "cp",
-            "Resting Blood Pressure (mmHg)": "trestbps",
-            "Serum Cholesterol (mg/dL)": "chol",
-            "Fasting Blood Sugar > 120 mg/dL": "fbs",
-            "Resting ECG": "restecg",
-            "Max Heart Rate (BPM)": "thalach",
-            "Exercise Induced Angina": "exang",
-            "ST Depression": "oldpeak",
-            "Slope of Peak Exercise ST Segment": "slope",
-            "Number of Major Vessels": "ca",
-            "Thalassemia": "thal"
-        }
-
-        # Ordered list of feature names
-        feature_order = [
-            "age", "sex", "cp", "trestbps", "chol",
-            "fbs", "restecg", "thalach", "exang",
-            "oldpeak", "slope", "ca", "thal"
-        ]
-
-        # Prepare the data
-        processed_data = []
-
-        for label in label_to_feature:
-            feature = label_to_feature[label]
-            if label in data:
-                value = data[label]
-                if label in mapping:
-                    if isinstance(mapping[label], dict):
-                        # For dictionary mappings
-                        value = mapping[label].get(value)
-                    elif callable(mapping[label]):
-                        # For callable mappings (e.g., lambda functions)
-                        try:
-                            value = mapping[label](value)
-                        except Exception as e:
-                            raise ValueError(f"Error processing {label}: {e}")
-                    else:
-                        raise ValueError(f"Invalid mapping type for {label}")
-                    
-                    if value is None:
-                        raise ValueError(f"Invalid value for {label}")
-                else:
-                    # If no mapping is defined, attempt to convert to float
-                    try:
-                        value = float(value)
-                    except ValueError:
-                        raise ValueError(f"Invalid input for {label}: must be a number.")
-                
-                processed_data.append(value)
-            else:
-                raise ValueError(f"Missing value for {label}")
-
-        # Create a pandas DataFrame with the collected data
-        input_df = pd.DataFrame([processed_data], columns=feature_order)
-        return input_df
+        return self.model.encoder.encode(data)
 
     # Save report
     def save_report(self):
@@ -281,37 +232,13 @@ class PatientFormTab:
 
         key = f"{first_name}_{last_name}_{date_of_birth}"
 
-        # Load and decrypt file
-        reports = {}
-        report_path = self.resource_path("hdisrep.json")
-        if os.path.exists(report_path):
-            try:
-                with open(report_path, "rb") as f:
-                    encrypted_data = f.read()
-                    if encrypted_data:
-                        decrypted_data = self.cipher_suite.decrypt(encrypted_data)
-                        reports = json.loads(decrypted_data.decode('utf-8'))
-                    else:
-                        reports = {}
-            except Exception as e:
-                # Handle error
-                response = mb.askyesno("Error", f"Error decrypting '{report_path}': {e}\n\nOverwrite with new data?")
-                if response:
-                    reports = {}
-                else:
-                    return
-        else:
-            reports = {}
-
-        # Add or update patient's data
-        reports[key] = data
-
-        # Save and encrypt updated data
-        try:
-            updated_data = json.dumps(reports).encode('utf-8')
-            encrypted_data = self.cipher_suite.encrypt(updated_data)
-            with open(report_path, "wb") as f:
-                f.write(encrypted_data)
-            mb.showinfo("Success", "Patient report saved successfully.")
-        except Exception as e:
-            mb.showerror("Error", f"An error occurred while saving the report: {e}")
+        # Encrypt and append the report on a worker thread
+        job = self.worker.submit(
+            self.store.save,
+            key,
+            data,
+            on_done=lambda _: mb.showinfo("Success", "Patient report saved successfully."),
+            on_error=lambda e: mb.showerror("Error", f"An error occurred while saving the report: {e}"),
+            on_finish=self.busy.stop,
+        )
+        self.busy.start("Saving report...", job, disable=[self.submit_button, self.save_button])
@@ -1,18 +1,24 @@
-
 import tkinter as tk
 from tkinter import ttk, messagebox
 import os
 import sys
 import subprocess
+import time
+from tabs.BackgroundWorker import BackgroundWorker, BusyIndicator
 
 """
-- Shows image of graph traversal in image viewer.
+- Shows the live decision tree in the image viewer.
+- The SVG is rendered from the current model (cached per model version), so it follows
+  retraining instead of the static images/tree.svg.
+- Optionally highlights the decision path of the last patient submitted in the form.
 """
 class ViewGraphTab:
 
     # Constructor
-    def __init__(self, parent):
+    def __init__(self, parent, model):
         self.frame = ttk.Frame(parent)
+        self.model = model
+        self.worker = BackgroundWorker(self.frame)
         self.create_widgets()
 
     # Function to get resource path
@@ -33,34 +39,88 @@ class ViewGraphTab:
             padding=10
         ).pack()
 
-        # Add BUTTON STYLE
+        # Add BUTTON STYLE (theme is set app wide in main.py)
         style = ttk.Style()
-        style.theme_use('clam') 
 
         # Configure BUTTON
         style.configure('Custom.TButton',
                         background='#4CAF50',
-                        foreground='white',  
+                        foreground='white',
                         font=('Arial', 12, 'bold'))
 
         # Apply STYLE
-        open_button = ttk.Button(
+        self.open_button = ttk.Button(
             self.frame,
             text="Open Graph",
             command=self.open_image,
             padding=10,
             style='Custom.TButton'
         )
-        open_button.pack(pady=20)
+        self.open_button.pack(pady=20)
+
+        # Decision path option
+        self.highlight_patient = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            self.frame,
+            text="Highlight the decision path of the last submitted patient",
+            variable=self.highlight_patient
+        ).pack()
+
+        # Busy indicator for background work
+        self.busy = BusyIndicator(self.frame)
+        self.busy.frame.pack(pady=5)
 
+        # Render time of the last graph
+        self.status_label = ttk.Label(self.frame, text="")
+        self.status_label.pack()
+
+    # Render the graph on a worker thread, then open it
     def open_image(self):
-        svg_relative_path = os.path.join("images", "tree.svg")
-        svg_path = self.resource_path(svg_relative_path)
+        features = None
+        if self.highlight_patient.get():
+            from tabs.PatientFormTab import PatientFormTab
+            features = PatientFormTab.last_features
+
+        job = self.worker.submit(
+            self.render_graph,
+            features,
+            on_done=self.show_graph,
+            on_error=lambda e: messagebox.showerror("Error", f"Could not render the graph: {e}"),
+            on_finish=self.busy.stop,
+        )
+        self.busy.start("Rendering graph...", job, disable=[self.open_button])
+
+    # Write the SVG of the current tree, with the patient's path if given (runs on a worker thread)
+    def render_graph(self, features=None):
+        from model.TreeEvaluator import TreeEvaluator
+        from model.tree_svg import cached_svg, highlight
+        start = time.perf_counter()
+        classifier = self.model.get_classifier()
+        if classifier is None:
+            raise ValueError("the graph needs the full model, not the compiled predictor.")
+        if not hasattr(classifier, "tree_"):
+            raise ValueError("the graph is only available for the decision tree backend.")
+        key, svg = cached_svg(classifier, self.model.get_feature_names(), self.model.cache_dir)
+        name = f"tree-{key[:16]}.svg"
+        if features is not None:
+            svg = highlight(svg, TreeEvaluator(classifier).decision_path(features))
+            name = f"tree-{key[:16]}-patient.svg"
+
+        path = os.path.join(self.model.cache_dir, name)
+        if features is not None or not os.path.exists(path):
+            os.makedirs(self.model.cache_dir, exist_ok=True)
+            with open(path, "w", encoding='utf-8') as f:
+                f.write(svg)
+        return path, time.perf_counter() - start
 
-        if not os.path.exists(svg_path):
-            messagebox.showerror("Error", f"The file '{svg_relative_path}' does not exist.")
-            return
+    # Show the render time and open the graph
+    def show_graph(self, result):
+        svg_path, seconds = result
+        self.status_label.config(text=f"Rendered in {seconds * 1000:.0f} ms")
+        self.open_file(svg_path)
 
+    # Open a file with the system viewer
+    def open_file(self, svg_path):
         try:
             if sys.platform.startswith('darwin'):
                 # macOS
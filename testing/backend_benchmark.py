@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+
+# Use the app's backends and dataset cache
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+from model.DatasetCache import DatasetCache
+from model.backends import BACKEND_PARAMS, fit_classifier, make_evaluator
+from model.compaction import compact_dataset
+
+"""
+- Compares the model backends (tree, forest, boosting) on the same split as test.py
+  (unique rows of heart.csv, duplicates collapsed into sample weights).
+- Reports accuracy and F1 on the test split, training time, single row latency (p50/p99)
+  and batch throughput of the evaluator the app uses.
+- Run from testing/: python backend_benchmark.py [--json results.json]
+"""
+
+
+# Latency percentiles of one row predictions, in microseconds
+def single_row_latency(evaluator, X, calls=1000):
+    samples = []
+    for i in range(calls):
+        row = X[i % len(X)]
+        start = time.perf_counter()
+        evaluator.predict(row)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1e6, samples[int(len(samples) * 0.99)] * 1e6
+
+
+# Rows per second for one large batch
+def batch_throughput(evaluator, X, rows=100000):
+    batch = X[np.arange(rows) % len(X)]
+    start = time.perf_counter()
+    evaluator.predict(batch)
+    return rows / (time.perf_counter() - start)
+
+
+# Train, score and time one backend
+def benchmark_backend(backend, X_train, X_test, y_train, y_test, w_train=None):
+    start = time.perf_counter()
+    classifier = fit_classifier(backend, BACKEND_PARAMS[backend], X_train, y_train, w_train)
+    train_seconds = time.perf_counter() - start
+    evaluator = make_evaluator(classifier)
+
+    X_test = X_test.to_numpy(dtype=np.float64)
+    y_pred = evaluator.predict(X_test)
+    p50, p99 = single_row_latency(evaluator, X_test)
+    return {
+        "backend": backend,
+        "params": BACKEND_PARAMS[backend],
+        "accuracy": accuracy_score(y_test, y_pred),
+        "f1": f1_score(y_test, y_pred),
+        "train_ms": train_seconds * 1000,
+        "predict_p50_us": p50,
+        "predict_p99_us": p99,
+        "batch_rows_per_s": batch_throughput(evaluator, X_test),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the model backends.")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKEND_PARAMS), default=list(BACKEND_PARAMS))
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    data, weights = compact_dataset(DatasetCache('./heart.csv', './model_cache').load())
+    X = data.iloc[:, :-1]
+    y = data.iloc[:, -1]
+    X_train, X_test, y_train, y_test, w_train, _ = train_test_split(X, y, weights, test_size=0.1, random_state=1)
+    print(f"{os.cpu_count()} CPUs, {len(X_train)} unique training rows ({w_train.sum():.0f} weighted), "
+          f"{len(X_test)} unique test rows\n")
+
+    results = []
+    print(f"{'backend':<10}{'accuracy':>10}{'F1':>8}{'train ms':>10}{'p50 us':>9}{'p99 us':>9}{'batch rows/s':>14}")
+    for backend in args.backends:
+        result = benchmark_backend(backend, X_train, X_test, y_train, y_test, w_train)
+        results.append(result)
+        print(f"{backend:<10}{result['accuracy']:>10.4f}{result['f1']:>8.4f}{result['train_ms']:>10.1f}"
+              f"{result['predict_p50_us']:>9.1f}{result['predict_p99_us']:>9.1f}{result['batch_rows_per_s']:>14.0f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.json}")
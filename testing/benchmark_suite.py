@@ -0,0 +1,293 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from datetime import datetime
+
+# Benchmarks run against the app's modules, never the Tk tabs, so no display is needed
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+sys.path.append(APP_DIR)
+from cryptography.fernet import Fernet
+from model.Model import Model
+from reports.KeyRing import KeyRing
+from reports.ReportCache import ReportCache
+from reports.ReportStore import ReportStore
+from reports.SearchIndex import SearchIndex
+from reports.report_pdf import ReportPDF, render_report
+
+"""
+- Headless benchmarks of the hot paths: Model.predict, form preprocessing (the encoder behind
+  PatientFormTab.preprocess_data), Fernet encrypt/decrypt of a report, the report store
+  (save, lookup, scan, search) on synthetic stores of 1k/10k/100k reports, and PDF rendering.
+- Sustained journaled saves per second with 1 to 32 saving threads (group commit, one fsync
+  per group); store fills past the first 2000 single saves use save_many.
+- Key rotation: re-encrypting a whole store in place with a new key (rotate_key.py).
+- Results are written as JSON; a previous results file can be used as the baseline:
+    python benchmark_suite.py --output baseline.json
+    python benchmark_suite.py --compare baseline.json --threshold 0.25
+  (the baseline is read before the run and cannot be the --output file)
+- Compare mode lists every benchmark slower than the baseline by more than the threshold
+  and exits with status 1 if there is any.
+"""
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David",
+               "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+              "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore"]
+
+
+# Form data of one synthetic patient, like PatientFormTab collects it
+def synthetic_report(rng, index):
+    first = rng.choice(FIRST_NAMES)
+    # Common surnames for a third of the patients, random ones so 100k stores stay varied
+    if index % 3 == 0:
+        last = rng.choice(LAST_NAMES)
+    else:
+        last = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 9))).capitalize()
+    return {
+        "First Name": first,
+        "Last Name": last,
+        "Date of Birth": f"{rng.randint(1930, 2005)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "Age": str(rng.randint(29, 77)),
+        "Sex": rng.choice(["Male", "Female"]),
+        "Chest Pain Type (0-3)": str(rng.randint(0, 3)),
+        "Resting Blood Pressure (mmHg)": str(rng.randint(94, 200)),
+        "Serum Cholesterol (mg/dL)": str(rng.randint(126, 564)),
+        "Fasting Blood Sugar > 120 mg/dL": rng.choice(["Yes", "No"]),
+        "Resting ECG": rng.choice(["Normal", "ST-T Wave Abnormality", "Left Ventricular Hypertrophy"]),
+        "Max Heart Rate (BPM)": str(rng.randint(71, 202)),
+        "Exercise Induced Angina": rng.choice(["Yes", "No"]),
+        "ST Depression": f"{rng.uniform(0, 6.2):.1f}",
+        "Slope of Peak Exercise ST Segment": rng.choice(["Upsloping", "Flat", "Downsloping"]),
+        "Number of Major Vessels": str(rng.randint(0, 3)),
+        "Thalassemia": rng.choice(["Normal", "Fixed Defect", "Reversible Defect"]),
+        "Confirmed Diagnosis": "Unconfirmed",
+        "Prediction Result": rng.choice(["NO signs of heart disease detected.", "Signs of heart disease detected."]),
+    }
+
+
+# Patient key the form uses for a report
+def report_key(report):
+    return f"{report['First Name']}_{report['Last Name']}_{report['Date of Birth']}"
+
+
+# Best time per call of fn over a few repeats
+def measure(fn, number, repeat=5):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+class BenchmarkSuite:
+
+    # Constructor
+    def __init__(self, sizes, work_dir):
+        self.sizes = sizes
+        self.work_dir = work_dir
+        self.results = {}
+        self.rng = random.Random(0)
+        # The app's key ring, Fernet behind it
+        self.key_path = os.path.join(work_dir, "secret.key")
+        KeyRing.write(self.key_path, [Fernet.generate_key()])
+        self.cipher = KeyRing(self.key_path)
+
+    # Record one benchmark; seconds is per operation of `unit`
+    def record(self, name, seconds, unit="call"):
+        self.results[name] = {"seconds": seconds, "unit": unit, "per_second": 1 / seconds if seconds else None}
+        print(f"  {name:<40} {seconds * 1e6:12.1f} us/{unit}")
+
+    # Run every benchmark
+    def run(self):
+        self.bench_model()
+        self.bench_crypto()
+        self.bench_pdf()
+        self.bench_journal()
+        for size in self.sizes:
+            self.bench_store(size)
+        return self.results
+
+    # Model.predict and the form encoder
+    def bench_model(self):
+        print("Model and preprocessing")
+        model = Model(cache_dir=os.path.join(self.work_dir, "model_cache"))
+        report = synthetic_report(self.rng, 0)
+        batch = [synthetic_report(self.rng, i) for i in range(10000)]
+        row = model.encoder.encode(report)
+        matrix = model.encoder.encode(batch)
+        self.record("preprocess.single", measure(lambda: model.encoder.encode(report), 2000))
+        self.record("preprocess.batch_10k", measure(lambda: model.encoder.encode(batch), 3) / len(batch), "row")
+        self.record("predict.single", measure(lambda: model.predict(row), 5000))
+        self.record("predict.batch_10k", measure(lambda: model.predict(matrix), 20) / len(matrix), "row")
+
+    # Fernet encrypt/decrypt of one report, as in save_report and get_patient_info
+    def bench_crypto(self):
+        print("Encryption")
+        report = synthetic_report(self.rng, 0)
+        plain = json.dumps({"key": report_key(report), "data": report}).encode('utf-8')
+        token = self.cipher.encrypt(plain)
+        self.record("fernet.encrypt_report", measure(lambda: self.cipher.encrypt(plain), 2000))
+        self.record("fernet.decrypt_report", measure(lambda: self.cipher.decrypt(token), 2000))
+
+    # Rendering one report to PDF, as in print_pdf
+    def bench_pdf(self):
+        print("PDF")
+        report = synthetic_report(self.rng, 0)
+
+        def render():
+            pdf = ReportPDF()
+            render_report(pdf, report)
+            pdf.output(dest='S')
+
+        self.record("pdf.render_report", measure(render, 50))
+
+    # Sustained saves per second through the journal, each saving thread waits for its fsync
+    def bench_journal(self, threads=(1, 4, 8, 32), seconds=2.0):
+        print("Report journal")
+        for n_threads in threads:
+            store = ReportStore(os.path.join(self.work_dir, f"journal_{n_threads}"), self.cipher)
+            reports = [synthetic_report(self.rng, i) for i in range(500)]
+            saved = [0] * n_threads
+            stop = time.perf_counter() + seconds
+
+            def saver(slot):
+                while time.perf_counter() < stop:
+                    report = reports[saved[slot] % len(reports)]
+                    store.save(f"{slot}_{saved[slot]}", report)
+                    saved[slot] += 1
+
+            commits = store.journal.commits
+            start = time.perf_counter()
+            workers = [threading.Thread(target=saver, args=(slot,)) for slot in range(n_threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+            total = sum(saved)
+            self.record(f"journal.save_{n_threads}_threads", elapsed / total, "report")
+            print(f"    {total / elapsed:10.0f} saves/s, {total / (store.journal.commits - commits):.1f} saves per fsync")
+            store.journal.close()
+
+    # Report store operations on a store of `size` reports
+    def bench_store(self, size, single_saves=2000):
+        print(f"Report store, {size} reports")
+        base = os.path.join(self.work_dir, f"store_{size}")
+        reports = [synthetic_report(self.rng, i) for i in range(size)]
+        keys = [report_key(report) for report in reports]
+
+        # Every single save waits for an fsync, the rest of the store is filled in batches
+        store = ReportStore(base, self.cipher)
+        singles = min(size, single_saves)
+        start = time.perf_counter()
+        for key, report in zip(keys[:singles], reports[:singles]):
+            store.save(key, report)
+        self.record(f"store_{size}.save", (time.perf_counter() - start) / singles, "report")
+        if size > singles:
+            start = time.perf_counter()
+            items = list(zip(keys[singles:], reports[singles:]))
+            for i in range(0, len(items), 1000):
+                store.save_many(items[i:i + 1000])
+            self.record(f"store_{size}.save_many", (time.perf_counter() - start) / len(items), "report")
+
+        start = time.perf_counter()
+        ReportStore(base, self.cipher)
+        self.record(f"store_{size}.open", time.perf_counter() - start, "open")
+
+        sample = [self.rng.choice(keys) for _ in range(500)]
+        lookups = iter(sample * 100)
+        self.record(f"store_{size}.get", measure(lambda: store.get(next(lookups)), len(sample) // 5))
+
+        cache = ReportCache(store)
+        for key in sample[:50]:
+            cache.get(key)
+        hits = iter(sample[:50] * 1000)
+        self.record(f"store_{size}.cache_hit", measure(lambda: cache.get(next(hits)), 1000))
+
+        start = time.perf_counter()
+        scanned = sum(1 for _ in store.iter_reports())
+        self.record(f"store_{size}.scan", (time.perf_counter() - start) / scanned, "report")
+
+        start = time.perf_counter()
+        index = SearchIndex.from_store(store)
+        self.record(f"store_{size}.search_index_build", time.perf_counter() - start, "build")
+        queries = iter([(report["First Name"], report["Last Name"][:-1] + "x") for report in reports[:200]] * 100)
+        self.record(f"store_{size}.fuzzy_search", measure(lambda: index.search(*next(queries)), 50, repeat=3))
+        # Checkpoint now, not at exit once the work directory is gone
+        store.journal.close()
+
+        # The whole tool run, worker start included
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "rotate_key.py", "--new-key", "--store", base, "--key", self.key_path],
+                       check=True, stdout=subprocess.DEVNULL)
+        self.record(f"store_{size}.rotate", (time.perf_counter() - start) / size, "report")
+
+
+# Benchmarks slower than the baseline by more than threshold, as (name, baseline, current, ratio)
+def compare(baseline, current, threshold):
+    regressions, rows = [], []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None or not before["seconds"]:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        rows.append((name, before["seconds"], result["seconds"], ratio))
+        if ratio > 1 + threshold:
+            regressions.append(rows[-1])
+    return rows, regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless benchmarks of the app's hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="store sizes")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    args = parser.parse_args()
+    output_path = os.path.abspath(args.output)
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    # Writing the results over the baseline would compare the run with itself
+    if compare_path == output_path:
+        parser.error(f"--compare {args.compare} is also the output file; pass another --output")
+    baseline = None
+    if compare_path:
+        with open(compare_path) as f:
+            baseline = json.load(f)
+
+    # The Model finds data/heart.csv relative to the working directory
+    os.chdir(APP_DIR)
+    work_dir = tempfile.mkdtemp(prefix="hda-bench-")
+    try:
+        suite = BenchmarkSuite(args.sizes, work_dir)
+        results = {
+            "meta": {
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "sizes": args.sizes,
+            },
+            "results": suite.run(),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if baseline is not None:
+        rows, regressions = compare(baseline, results, args.threshold)
+        print(f"\nAgainst {args.compare} ({baseline['meta']['date']}):")
+        for name, before, after, ratio in rows:
+            flag = "  SLOWER" if ratio > 1 + args.threshold else ""
+            print(f"  {name:<40} {before * 1e6:12.1f} -> {after * 1e6:12.1f} us  x{ratio:5.2f}{flag}")
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower by more than {args.threshold:.0%}.")
+            sys.exit(1)
+        print(f"\nNo slowdowns above {args.threshold:.0%}.")
@@ -0,0 +1,167 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sklearn.model_selection import RepeatedStratifiedKFold
+
+# Use the app's backends and dataset cache
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+from model.DatasetCache import DatasetCache
+from model.backends import BACKEND_PARAMS, fit_classifier
+from model.compaction import compact_dataset
+
+"""
+- Repeated stratified k-fold evaluation of a model backend, folds run in worker processes.
+- Runs on the unique rows of heart.csv (duplicates collapsed into sample weights by the app's
+  model/compaction.py), so no test row has an exact copy in the training folds.
+- Fold indices are cached in ./model_cache keyed by the labels and the CV settings.
+- Reports mean/std of the print_metrics metrics (F1, accuracy, recall, precision) and the
+  summed confusion matrix, and writes every fold to a JSON results file.
+- Run from testing/: python cross_validation.py [--backend tree] [--splits 5] [--repeats 10]
+"""
+
+METRICS = ["f1", "accuracy", "recall", "precision"]
+
+# Data shared with the worker processes
+_X = None
+_y = None
+_w = None
+
+
+# Store data in worker globals so tasks only carry index arrays
+def _init_worker(X, y, sample_weight=None):
+    global _X, _y, _w
+    _X = X
+    _y = y
+    _w = sample_weight
+
+
+# Metrics of print_metrics from the confusion counts of 0/1 labels (0.0 when undefined, like sklearn)
+def binary_metrics(y_true, y_pred):
+    tp = int(np.count_nonzero((y_true == 1) & (y_pred == 1)))
+    tn = int(np.count_nonzero((y_true == 0) & (y_pred == 0)))
+    fp = int(np.count_nonzero((y_true == 0) & (y_pred == 1)))
+    fn = int(np.count_nonzero((y_true == 1) & (y_pred == 0)))
+    return {
+        "f1": 0.0 if 2 * tp + fp + fn == 0 else 2.0 * tp / (2 * tp + fp + fn),
+        "accuracy": (tp + tn) / len(y_true),
+        "recall": 0.0 if tp + fn == 0 else tp / (tp + fn),
+        "precision": 0.0 if tp + fp == 0 else tp / (tp + fp),
+        "confusion_matrix": [[tn, fp], [fn, tp]],
+    }
+
+
+# Test indices of every fold, loaded from the cache when the labels and settings match
+def build_folds(y, n_splits, n_repeats, random_state, cache_dir=None):
+    digest = hashlib.sha256(np.ascontiguousarray(y).tobytes())
+    digest.update(f"{n_splits}:{n_repeats}:{random_state}".encode('utf-8'))
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = os.path.join(cache_dir, f"folds-{digest.hexdigest()[:16]}.npz")
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as cached:
+                return [cached[f"fold_{i}"] for i in range(len(cached.files))]
+
+    cv = RepeatedStratifiedKFold(n_splits=n_splits, n_repeats=n_repeats, random_state=random_state)
+    folds = [test_idx for _, test_idx in cv.split(np.zeros(len(y)), y)]
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, **{f"fold_{i}": fold for i, fold in enumerate(folds)})
+        os.replace(tmp_path, cache_path)
+    return folds
+
+
+# Fit and score a group of folds in a worker
+def _run_folds(backend, params, folds):
+    rows = []
+    for fold, test_idx in folds:
+        train_mask = np.ones(len(_y), dtype=bool)
+        train_mask[test_idx] = False
+        start = time.perf_counter()
+        w_train = None if _w is None else _w[train_mask]
+        classifier = fit_classifier(backend, params, _X[train_mask], _y[train_mask], w_train)
+        y_pred = classifier.predict(_X[test_idx])
+        row = {"fold": fold, "fit_seconds": time.perf_counter() - start}
+        row.update(binary_metrics(_y[test_idx], y_pred))
+        rows.append(row)
+    return rows
+
+
+# Cross-validate one backend and return a summary with every fold
+def cross_validate(X, y, backend="tree", params=None, n_splits=5, n_repeats=10, random_state=1,
+                   n_jobs=None, cache_dir=None, sample_weight=None):
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    sample_weight = None if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+    params = dict(BACKEND_PARAMS[backend] if params is None else params)
+    if backend == "forest":
+        # Folds already run in parallel
+        params["n_jobs"] = 1
+    start = time.perf_counter()
+    folds = list(enumerate(build_folds(y, n_splits, n_repeats, random_state, cache_dir)))
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(folds))
+
+    # One task per worker and repeat keeps the process overhead small
+    chunks = [folds[i:i + n_splits] for i in range(0, len(folds), n_splits)]
+    if n_jobs == 1:
+        _init_worker(X, y, sample_weight)
+        fold_rows = [row for chunk in chunks for row in _run_folds(backend, params, chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(X, y, sample_weight)) as executor:
+            futures = [executor.submit(_run_folds, backend, params, chunk) for chunk in chunks]
+            fold_rows = [row for future in futures for row in future.result()]
+
+    summary = {
+        "backend": backend,
+        "params": params,
+        "n_splits": n_splits,
+        "n_repeats": n_repeats,
+        "random_state": random_state,
+        "n_samples": int(len(y)),
+        "n_weighted_samples": float(len(y) if sample_weight is None else sample_weight.sum()),
+        "seconds": time.perf_counter() - start,
+        "confusion_matrix": np.sum([row["confusion_matrix"] for row in fold_rows], axis=0).tolist(),
+    }
+    for metric in METRICS:
+        values = np.array([row[metric] for row in fold_rows])
+        summary[metric] = {"mean": float(values.mean()), "std": float(values.std(ddof=1)) if len(values) > 1 else 0.0}
+    summary["folds"] = fold_rows
+    return summary
+
+
+# Print the summary in the style of print_metrics
+def print_summary(summary):
+    print(f"\033[1;93m*******************{summary['n_repeats']}x{summary['n_splits']} CV for "
+          f"{summary['backend']} {summary['params']}*******************\033[0m")
+    print(f"Summed Confusion Matrix: {summary['confusion_matrix']}")
+    for metric in METRICS:
+        print(f"{metric.capitalize()}: {summary[metric]['mean']:.4f} +/- {summary[metric]['std']:.4f}")
+    print(f"{len(summary['folds'])} folds in {summary['seconds']:.2f}s\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cross-validate a model backend on heart.csv.")
+    parser.add_argument("--backend", choices=list(BACKEND_PARAMS), default="tree")
+    parser.add_argument("--params", type=json.loads, help="hyperparameters as JSON, default: the app's")
+    parser.add_argument("--splits", type=int, default=5, help="folds per repeat")
+    parser.add_argument("--repeats", type=int, default=10, help="number of reshuffled repeats")
+    parser.add_argument("--random-state", type=int, default=1)
+    parser.add_argument("--jobs", type=int, help="worker processes, default: all CPUs")
+    parser.add_argument("--output", default="cv_results.json", help="JSON results file")
+    args = parser.parse_args()
+
+    data, weights = compact_dataset(DatasetCache('./heart.csv', './model_cache').load())
+    summary = cross_validate(
+        data.iloc[:, :-1], data.iloc[:, -1], backend=args.backend, params=args.params,
+        n_splits=args.splits, n_repeats=args.repeats, random_state=args.random_state,
+        n_jobs=args.jobs, cache_dir='./model_cache', sample_weight=weights,
+    )
+    print_summary(summary)
+    with open(args.output, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Results saved to {args.output}")
@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from cross_validation import binary_metrics, build_folds
+
+# Use the app's model, backends and dataset cache
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+sys.path.append(APP_DIR)
+from model.DatasetCache import DatasetCache
+from model.PruningPath import PruningPath
+from model.backends import BACKEND_PARAMS, fit_classifier
+from model.compaction import compact_dataset
+
+"""
+- Cost-complexity pruning search for the decision tree, the alternative to refitting a tree for
+  every max_depth in test.py.
+- The candidate alphas come from the unpruned tree (ccp_alpha forced to 0) fitted on all the
+  data; every CV fold fits one tree and scores all the pruned subtrees of it by masking
+  (model/PruningPath.py), so the whole alpha / depth / leaves / F1 curve costs one fit per fold.
+- The best mean F1 wins, ties go to the larger alpha (the smaller tree).
+- --export refits the app's Model with the chosen ccp_alpha and saves its artifact in
+  app/model_cache; set the printed params in BACKEND_PARAMS to make it the default.
+- Run from testing/: python pruning_search.py [--splits 5] [--repeats 10] [--export]
+"""
+
+
+# Score every pruned subtree on repeated stratified k-fold and return (best row, curve)
+def search_pruning(X, y, sample_weight=None, params=None, n_splits=5, n_repeats=10, random_state=1,
+                   cache_dir=None):
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    sample_weight = np.ones(len(y)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+    # The path starts from the unpruned tree, the app's params already hold the chosen ccp_alpha
+    params = {**(BACKEND_PARAMS["tree"] if params is None else params), "ccp_alpha": 0.0}
+
+    start = time.perf_counter()
+    path = PruningPath(fit_classifier("tree", params, X, y, sample_weight))
+    alphas = path.candidate_alphas()
+    depth, leaves, impurity = path.subtree_stats(alphas)
+
+    folds = build_folds(y, n_splits, n_repeats, random_state, cache_dir)
+    scores = {"f1": np.empty((len(folds), len(alphas))), "accuracy": np.empty((len(folds), len(alphas)))}
+    for i, test_idx in enumerate(folds):
+        train_mask = np.ones(len(y), dtype=bool)
+        train_mask[test_idx] = False
+        fold_tree = fit_classifier("tree", params, X[train_mask], y[train_mask], sample_weight[train_mask])
+        for j, y_pred in enumerate(PruningPath(fold_tree).predict(X[test_idx], alphas)):
+            metrics = binary_metrics(y[test_idx], y_pred)
+            scores["f1"][i, j] = metrics["f1"]
+            scores["accuracy"][i, j] = metrics["accuracy"]
+
+    results = pd.DataFrame({
+        "ccp_alpha": alphas,
+        "depth": depth,
+        "leaves": leaves,
+        "impurity": impurity,
+        "f1": scores["f1"].mean(axis=0),
+        "f1_std": scores["f1"].std(axis=0, ddof=1) if len(folds) > 1 else 0.0,
+        "accuracy": scores["accuracy"].mean(axis=0),
+    })
+    # Last maximum: alphas are sorted, so ties pick the smaller tree
+    best_index = len(results) - 1 - int(np.argmax(results["f1"].to_numpy()[::-1]))
+    best = results.iloc[best_index].to_dict()
+    # Export the middle of the alpha interval that keeps this subtree, away from rounding at its edges
+    upper = alphas[best_index + 1] if best_index + 1 < len(alphas) else 2 * alphas[best_index]
+    best["params"] = {**params, "ccp_alpha": round(float(alphas[best_index] + upper) / 2, 6)}
+    best["seconds"] = time.perf_counter() - start
+    best["fits"] = len(folds) + 1
+    return best, results
+
+
+# Print the curve and the winner
+def print_pruning(best, results):
+    with pd.option_context("display.max_rows", None, "display.width", 120):
+        print(results.to_string(index=False, float_format=lambda value: f"{value:.4f}"))
+    print(f"\nBest ccp_alpha {best['ccp_alpha']:.5f}: depth {best['depth']:.0f}, {best['leaves']:.0f} leaves, "
+          f"F1 {best['f1']:.4f} +/- {best['f1_std']:.4f}")
+    print(f"{len(results)} subtrees scored with {best['fits']} fits in {best['seconds']:.2f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cost-complexity pruning search for the decision tree.")
+    parser.add_argument("--params", type=json.loads, help="base tree hyperparameters as JSON, default: the app's")
+    parser.add_argument("--splits", type=int, default=5, help="folds per repeat")
+    parser.add_argument("--repeats", type=int, default=10, help="number of reshuffled repeats")
+    parser.add_argument("--random-state", type=int, default=1)
+    parser.add_argument("--export", action="store_true", help="save the pruned tree as the app's model artifact")
+    args = parser.parse_args()
+
+    data, weights = compact_dataset(DatasetCache('./heart.csv', './model_cache').load())
+    best, results = search_pruning(
+        data.iloc[:, :-1], data.iloc[:, -1], sample_weight=weights, params=args.params,
+        n_splits=args.splits, n_repeats=args.repeats, random_state=args.random_state,
+        cache_dir='./model_cache',
+    )
+    print_pruning(best, results)
+
+    if args.export:
+        # The Model finds data/heart.csv relative to the working directory
+        os.chdir(APP_DIR)
+        from model.Model import Model
+        model = Model(params=best["params"])
+        print(f"Pruned tree saved to {model.artifact_path()}")
+        print(f"Use it by default with BACKEND_PARAMS['tree'] = {best['params']}")
@@ -1,4 +1,3 @@
-import pandas as pd
 from sklearn.tree import DecisionTreeClassifier, plot_tree
 from sklearn.metrics import f1_score, confusion_matrix, accuracy_score, recall_score, precision_score
 from sklearn.model_selection import train_test_split
@@ -6,30 +5,42 @@ from sklearn.cluster import KMeans
 import numpy as np
 import matplotlib.pyplot as plt
 import os
-
-# Load data from CSV file
+import sys
+from tree_search import search_best_tree
+from cross_validation import cross_validate, print_summary
+from pruning_search import search_pruning, print_pruning
+
+# Share the app's dataset cache
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+from model.DatasetCache import DatasetCache
+from model.compaction import compact_dataset
+
+# Load data from CSV file (cleaned and memory-mapped from ./model_cache after the first run)
+# Duplicate rows are collapsed into weights so no test row has a copy in the training set
 def getData():
-    data = pd.read_csv('./heart.csv')
+    data, weights = compact_dataset(DatasetCache('./heart.csv', './model_cache').load())
     feature_names = data.columns
-    data = data.fillna(data.mean())
+    print(f"{len(data)} unique rows out of {weights.sum():.0f}")
     print(data['target'].value_counts())
     X = data.iloc[:, :-1]
     y = data.iloc[:, -1]
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.1, random_state=1)
-    return feature_names, X_train, X_test, y_train, y_test
+    X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(
+        X, y, weights, test_size=0.1, random_state=1
+    )
+    return feature_names, X_train, X_test, y_train, y_test, w_train, w_test
 
 # Print metrics
 def print_metrics(y_test, y_pred, model):
     print(f'\033[1;93m*******************Metrics for {model}*******************\033[0m\nConfusion Matrix: {confusion_matrix(y_test, y_pred)}\nF1 Score: {f1_score(y_test, y_pred)}\nAccuracy Score: {accuracy_score(y_test, y_pred)}\nRecall Score: {recall_score(y_test, y_pred)}\nPrecision Score: {precision_score(y_test, y_pred)}\n\n************************************************\n')
 
-# Resplit data
-def resplitData(X_train, X_test, y_train, y_test, random_state, test_size):
+# Resplit data (and the sample weights)
+def resplitData(X_train, X_test, y_train, y_test, w_train, w_test, random_state, test_size):
     X_combined = np.concatenate((X_train, X_test), axis=0)
     y_combined = np.concatenate((y_train, y_test), axis=0)
-    X_train_new, X_test_new, y_train_new, y_test_new = train_test_split(
-        X_combined, y_combined, test_size=test_size, random_state=random_state
+    w_combined = np.concatenate((w_train, w_test), axis=0)
+    return train_test_split(
+        X_combined, y_combined, w_combined, test_size=test_size, random_state=random_state
     )
-    return X_train_new, X_test_new, y_train_new, y_test_new
 
 # Controled input based tree traversal
 import numpy as np
@@ -62,25 +73,26 @@ def treeTraversal(clf, columns):
 
 
 # Find the best tree based on F1 score
-def findBestTree(X_train, y_train, X_test, y_test):
-    bestTree = None
-    bestF1 = 0
-    best_test_size = None
-    for i in range(1, 100):
-        for j in range(1, 10):
-            X_train_resplit, X_test_resplit, y_train_resplit, y_test_resplit = resplitData(
-                X_train, X_test, y_train, y_test, i, float(j)/10.0
-            )
-            for k in range(1, X_train_resplit.shape[1]):
-                tree = DecisionTreeClassifier(max_depth=k, random_state=i)
-                tree.fit(X_train_resplit, y_train_resplit)
-                y_pred = tree.predict(X_test_resplit)
-                f1 = f1_score(y_test_resplit, y_pred)
-                if f1 > bestF1:
-                    bestF1 = f1
-                    bestTree = tree
-                    best_test_size = float(j)/10.0
-    return bestTree, best_test_size
+def findBestTree(X_train, y_train, X_test, y_test, w_train, w_test, target_f1=None):
+    X_combined = np.concatenate((X_train, X_test), axis=0)
+    y_combined = np.concatenate((y_train, y_test), axis=0)
+    best, results = search_best_tree(
+        X_combined, y_combined,
+        random_states=range(1, 100),
+        test_sizes=[float(j)/10.0 for j in range(1, 10)],
+        depths=range(1, X_combined.shape[1]),
+        target_f1=target_f1,
+        sample_weight=np.concatenate((w_train, w_test), axis=0)
+    )
+    print(f"Top configurations:\n{results.sort_values('f1', ascending=False, kind='stable').head(10)}")
+
+    # Refit the winning configuration on its split
+    X_train_resplit, X_test_resplit, y_train_resplit, y_test_resplit, w_train_resplit, _ = resplitData(
+        X_train, X_test, y_train, y_test, w_train, w_test, best['random_state'], best['test_size']
+    )
+    bestTree = DecisionTreeClassifier(max_depth=best['max_depth'], random_state=best['random_state'])
+    bestTree.fit(X_train_resplit, y_train_resplit, sample_weight=w_train_resplit)
+    return bestTree, best['test_size']
 
 # Plot tree
 def make_img(tree, feature_names):
@@ -106,14 +118,29 @@ def make_img(tree, feature_names):
 # Main function
 if __name__ == '__main__':
     # Use pandas to get data from CSV file and process null inputs
-    columns, X_train, X_test, y_train, y_test = getData()
+    columns, X_train, X_test, y_train, y_test, w_train, w_test = getData()
 
     # Find the best tree based on F1 score
-    bestTree, best_data_split = findBestTree(X_train, y_train, X_test, y_test)
+    bestTree, best_data_split = findBestTree(X_train, y_train, X_test, y_test, w_train, w_test)
     print(f'Best data split:\n\tTrain: {1-best_data_split}\n\tTest: {best_data_split}\nBest tree: {bestTree}')
     y_pred = bestTree.predict(X_test)
     print_metrics(y_test, y_pred, 'Decision Tree')
 
+    # The winner was picked on one split, check its depth with repeated CV as well
+    print_summary(cross_validate(
+        np.concatenate((X_train, X_test)), np.concatenate((y_train, y_test)),
+        params={"max_depth": bestTree.max_depth, "random_state": bestTree.random_state},
+        cache_dir='./model_cache', sample_weight=np.concatenate((w_train, w_test)),
+    ))
+
+    # Pruning curve of the winner's depth, every subtree scored without refitting
+    print_pruning(*search_pruning(
+        np.concatenate((X_train, X_test)), np.concatenate((y_train, y_test)),
+        sample_weight=np.concatenate((w_train, w_test)),
+        params={"max_depth": bestTree.max_depth, "random_state": bestTree.random_state},
+        cache_dir='./model_cache',
+    ))
+
     # Possible overfitting, will check tree traversal
     treeTraversal(bestTree, columns)
 
@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.tree import DecisionTreeClassifier
+
+"""
+- Parallel hyperparameter search for the decision tree (random_state, test_size, max_depth).
+- Split indices are built once, the data is shipped once to every worker process.
+- F1 is computed with NumPy on the precomputed test indices.
+- Pass the rows compacted by the app's model/compaction.py with their counts as sample_weight:
+  splits are then over unique rows and every fit does a third of the work.
+"""
+
+# Data shared with the worker processes
+_X = None
+_y = None
+_w = None
+
+
+# Store data in worker globals so tasks only carry index arrays
+def _init_worker(X, y, sample_weight=None):
+    global _X, _y, _w
+    _X = X
+    _y = y
+    _w = sample_weight
+
+
+# Binary F1 score for 0/1 labels (0.0 when there are no positives, like sklearn)
+def f1_binary(y_true, y_pred):
+    tp = np.count_nonzero((y_true == 1) & (y_pred == 1))
+    fp = np.count_nonzero((y_true == 0) & (y_pred == 1))
+    fn = np.count_nonzero((y_true == 1) & (y_pred == 0))
+    denom = 2 * tp + fp + fn
+    return 0.0 if denom == 0 else 2.0 * tp / denom
+
+
+# Build every train/test split once; same partitions as resplitData
+def build_splits(n_samples, random_states, test_sizes):
+    index = np.arange(n_samples)
+    splits = []
+    for random_state in random_states:
+        for test_size in test_sizes:
+            train_idx, test_idx = train_test_split(index, test_size=test_size, random_state=random_state)
+            splits.append((random_state, test_size, train_idx, test_idx))
+    return splits
+
+
+# Fit every depth on one split
+def _fit_split(random_state, test_size, train_idx, test_idx, depths):
+    X_train, y_train = _X[train_idx], _y[train_idx]
+    X_test, y_test = _X[test_idx], _y[test_idx]
+    w_train = None if _w is None else _w[train_idx]
+    rows = []
+    for depth in depths:
+        tree = DecisionTreeClassifier(max_depth=depth, random_state=random_state)
+        tree.fit(X_train, y_train, sample_weight=w_train)
+        rows.append((random_state, test_size, depth, f1_binary(y_test, tree.predict(X_test))))
+    return rows
+
+
+# Default progress reporter
+def print_progress(done, total, best_f1, elapsed):
+    sys.stdout.write(f"\r{done}/{total} splits, best F1 {best_f1:.4f}, {elapsed:.1f}s")
+    if done == total:
+        sys.stdout.write("\n")
+    sys.stdout.flush()
+
+
+# Search the grid in parallel and return (best config, results table)
+def search_best_tree(X, y, random_states, test_sizes, depths, n_jobs=None,
+                     target_f1=None, progress=print_progress, sample_weight=None):
+    X = np.asarray(X)
+    y = np.asarray(y)
+    sample_weight = None if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+    depths = list(depths)
+    splits = build_splits(len(y), random_states, test_sizes)
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    rows = []
+    best_f1 = 0.0
+    done = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(X, y, sample_weight)) as executor:
+        pending = {
+            executor.submit(_fit_split, random_state, test_size, train_idx, test_idx, depths)
+            for random_state, test_size, train_idx, test_idx in splits
+        }
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                split_rows = future.result()
+                rows.extend(split_rows)
+                best_f1 = max(best_f1, max(row[3] for row in split_rows))
+                done += 1
+            if progress is not None:
+                progress(done, len(splits), best_f1, time.perf_counter() - start)
+
+            # Stop early, splits still running are left to finish
+            if target_f1 is not None and best_f1 >= target_f1:
+                for future in pending:
+                    future.cancel()
+                if progress is not None and done < len(splits):
+                    sys.stdout.write(f"\nTarget F1 {target_f1} reached, stopping early.\n")
+                break
+
+    # Same tie breaking as the serial loop: first config in grid order wins
+    results = pd.DataFrame(rows, columns=["random_state", "test_size", "max_depth", "f1"])
+    results = results.sort_values(["random_state", "test_size", "max_depth"], kind="stable").reset_index(drop=True)
+    best = results.loc[results["f1"].idxmax()].to_dict()
+    best["random_state"] = int(best["random_state"])
+    best["max_depth"] = int(best["max_depth"])
+    return best, results